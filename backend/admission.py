@@ -0,0 +1,214 @@
+"""
+Per-client admission control: cost-weighted token buckets per client and
+route, plus a global in-flight cap that sheds load early with 429.
+"""
+import os
+import json
+import math
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from db_indexes import register_indexes, register_query
+from mongo_config import for_write
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+# Bucket size and refill rate in cost units; a read costs 1
+# Defaults allow ~60 quick chats and ~60 chats/minute sustained per client IP,
+# which also covers several people sharing one NAT or a desktop install
+RATE_LIMIT_CAPACITY = float(os.environ.get('RATE_LIMIT_CAPACITY', '120'))
+RATE_LIMIT_REFILL_PER_SEC = float(os.environ.get('RATE_LIMIT_REFILL_PER_SEC', '2'))
+MAX_IN_FLIGHT = int(os.environ.get('MAX_IN_FLIGHT', '64'))
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+# Hint for clients rejected while the instance drains for a restart
+DRAIN_RETRY_AFTER_SECONDS = float(os.environ.get('DRAIN_RETRY_AFTER_SECONDS', '2'))
+
+# LLM-backed routes drain the bucket faster than reads; interactive turns
+# stay cheap so normal conversation pace is never throttled
+ROUTE_COSTS = {
+    "/api/chat": 2,
+    "/api/interview/generate-questions": 5,
+    "/api/interview/evaluate-answer": 2,
+    "/api/interview/mock-continue": 2,
+}
+DEFAULT_COST = 1
+MEMORY_MAX_KEYS = 100_000
+
+# Idle buckets refill to full anyway, so their state can expire
+register_indexes("rate_limits", [IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=3600)])
+register_query("rate_limits.by_key", "rate_limits", {"_id": "client:route"})
+
+
+class MemoryRateLimitBackend:
+    """Token buckets in process memory; limits apply per worker"""
+
+    def __init__(self):
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        if len(self.buckets) >= MEMORY_MAX_KEYS and key not in self.buckets:
+            self._prune(now, capacity, rate)
+        self.buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _prune(self, now: float, capacity: float, rate: float):
+        # Buckets idle long enough to be full again carry no state
+        idle = capacity / rate
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < idle}
+
+
+class MongoRateLimitBackend:
+    """
+    Token buckets in the `rate_limits` collection, shared by all workers.
+    Refill and take happen in one atomic pipeline update per request.
+    """
+
+    def __init__(self, db):
+        self.collection = db.rate_limits
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float]:
+        now = datetime.now(timezone.utc)
+        elapsed_sec = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed_sec, rate]}]}]}
+        doc = await for_write(self.collection, "rate_limit").find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0, "tokens": 1, "allowed": 1}
+        )
+        if doc["allowed"]:
+            return True, 0.0
+        return False, (cost - doc["tokens"]) / rate
+
+
+def get_rate_limit_backend(db):
+    """Build the backend selected by RATE_LIMIT_BACKEND"""
+    if RATE_LIMIT_BACKEND == 'mongo':
+        return MongoRateLimitBackend(db)
+    return MemoryRateLimitBackend()
+
+
+class AdmissionController:
+    """
+    Admission decisions and counters; shared between the middleware and
+    the stats endpoint
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryRateLimitBackend()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = Counter()
+        # Set by the drain controller during shutdown
+        self.draining = False
+
+    async def admit(self, client_id: str, path: str) -> Tuple[Optional[str], float]:
+        """
+        Return (None, 0) to admit, or (reason, retry_after_seconds) to reject
+        """
+        route = path if path in ROUTE_COSTS else "default"
+        if self.draining:
+            self.rejected[f"draining:{route}"] += 1
+            return "draining", DRAIN_RETRY_AFTER_SECONDS
+        # Shed before doing any other work when this worker is saturated
+        if self.in_flight >= MAX_IN_FLIGHT:
+            self.rejected[f"overloaded:{route}"] += 1
+            return "overloaded", 1.0
+
+        cost = ROUTE_COSTS.get(path, DEFAULT_COST)
+        try:
+            allowed, retry_after = await self.backend.take(
+                f"{client_id}:{route}", cost, RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL_PER_SEC
+            )
+        except Exception as e:
+            # Fail open: a limiter outage must not take the API down with it
+            logger.error(f"Rate limiter error, admitting request: {str(e)}")
+            return None, 0.0
+        if not allowed:
+            self.rejected[f"rate_limited:{route}"] += 1
+            return "rate_limited", retry_after
+        return None, 0.0
+
+    def snapshot(self) -> dict:
+        """Admission counters for monitoring"""
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "max_in_flight": MAX_IN_FLIGHT,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that rejects with 429 + Retry-After when the worker is
+    saturated or the client's bucket for the route is empty, and with 503
+    while the instance drains
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    def _client_id(self, scope) -> str:
+        headers = dict(scope.get("headers") or [])
+        if TRUST_FORWARDED_FOR and b"x-forwarded-for" in headers:
+            return headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _reject(self, send, reason: str, retry_after: float):
+        draining = reason == "draining"
+        detail = "Server is restarting" if draining else "Too many requests"
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+        ]
+        if draining:
+            # Do not keep the client's connection pinned to an instance going away
+            headers.append((b"connection", b"close"))
+        await send({
+            "type": "http.response.start",
+            "status": 503 if draining else 429,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        path = scope["path"]
+        reason, retry_after = await controller.admit(self._client_id(scope), path)
+        if reason:
+            await self._reject(send, reason, retry_after)
+            return
+
+        controller.in_flight += 1
+        controller.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
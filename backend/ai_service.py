@@ -1,7 +1,12 @@
 import os
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 from dotenv import load_dotenv
 import logging
+import uuid
+from typing import List, Optional
+
+from prompt_builder import build_chat_prompt
+from model_router import model_router, CHAT
+from llm_cassette import cassette
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -9,33 +14,45 @@ load_dotenv()
 class AIService:
     def __init__(self):
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not self.api_key:
+        if not self.api_key and not cassette.offline:
             raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
         logger.info("AI Service initialized with Emergent LLM Key")
     
-    async def get_response(self, message: str, conversation_id: str) -> str:
+    async def get_response(
+        self,
+        message: str,
+        conversation_id: str,
+        history: Optional[List[dict]] = None,
+        summary: Optional[str] = None,
+    ) -> dict:
         """
-        Get AI response for a user message
+        Get AI response for a user message.
+
+        History is passed explicitly and trimmed to the prompt token budget;
+        messages that no longer fit are folded into the returned summary,
+        which the caller persists for the next turn.
         """
         try:
-            # Initialize chat with unique session ID and system message
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=conversation_id,
-                system_message="You are ManuGPT, a helpful AI assistant. Provide clear, accurate, and helpful responses."
+            prompt = build_chat_prompt(message, history or [], summary)
+
+            # Fresh session per call so the LLM client never accumulates history
+            response = await model_router.send_message(
+                CHAT,
+                session_id=f"chat_{conversation_id}_{uuid.uuid4()}",
+                system_message=prompt.system_message,
+                text=prompt.text
             )
             
-            # Use default model (gpt-4o-mini as per playbook)
-            chat.with_model("openai", "gpt-4o-mini")
-            
-            # Create user message
-            user_message = UserMessage(text=message)
-            
-            # Get response
-            response = await chat.send_message(user_message)
-            
-            logger.info(f"AI response generated for conversation {conversation_id}")
-            return response
+            logger.info(
+                f"AI response generated for conversation {conversation_id} "
+                f"(prompt_tokens={prompt.prompt_tokens}, evicted={len(prompt.evicted)})"
+            )
+            return {
+                "content": response,
+                "prompt_tokens": prompt.prompt_tokens,
+                "summary": prompt.summary,
+                "evicted": prompt.evicted,
+            }
             
         except Exception as e:
             logger.error(f"Error getting AI response: {str(e)}")
@@ -0,0 +1,124 @@
+"""
+Benchmark: the chat write/read mix under each Mongo client profile and
+write-concern tier, against a local (or BENCH_MONGO_URL) mongod.
+
+Each worker repeats what one /chat request does to Mongo: read the
+conversation, read history, insert a message and bump updated_at. Results
+are per-operation latency percentiles and overall throughput.
+
+    python bench_mongo_profiles.py [--profiles default,low_latency] [--workers 32] [--ops 200]
+"""
+import os
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from mongo_config import PROFILES, WRITE_CONCERNS, client_options
+
+BENCH_MONGO_URL = os.environ.get('BENCH_MONGO_URL', 'mongodb://localhost:27017')
+BENCH_DB_NAME = 'bench_mongo_profiles'
+HISTORY_SIZE = 40
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def seed(db, conversations):
+    now = datetime.now(timezone.utc)
+    await db.conversations.insert_many([
+        {"id": cid, "title": "Bench", "created_at": now, "updated_at": now} for cid in conversations
+    ])
+    await db.messages.insert_many([
+        {
+            "id": str(uuid.uuid4()),
+            "conversation_id": cid,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "lorem ipsum dolor sit amet " * 20,
+            "created_at": now,
+        }
+        for cid in conversations
+        for i in range(HISTORY_SIZE)
+    ])
+    await db.messages.create_index([("conversation_id", 1), ("created_at", 1)])
+    await db.conversations.create_index("id", unique=True)
+
+
+async def worker(db, conversation_id, ops, timings, touch_tier, append_tier):
+    conversations = db.conversations
+    touch = conversations.with_options(write_concern=WRITE_CONCERNS[touch_tier])
+    append = db.messages.with_options(write_concern=WRITE_CONCERNS[append_tier])
+    for _ in range(ops):
+        start = time.perf_counter()
+        await conversations.find_one({"id": conversation_id}, {"_id": 0, "id": 1})
+        t1 = time.perf_counter()
+        await db.messages.find(
+            {"conversation_id": conversation_id}, {"_id": 0, "role": 1, "content": 1}
+        ).sort("created_at", 1).to_list(None)
+        t2 = time.perf_counter()
+        await append.insert_one({
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": "user",
+            "content": "benchmark message " * 10,
+            "created_at": datetime.now(timezone.utc),
+        })
+        t3 = time.perf_counter()
+        await touch.update_one({"id": conversation_id}, {"$set": {"updated_at": datetime.now(timezone.utc)}})
+        t4 = time.perf_counter()
+        timings["get"].append(t1 - start)
+        timings["history"].append(t2 - t1)
+        timings["append"].append(t3 - t2)
+        timings["touch"].append(t4 - t3)
+
+
+async def run(profile, workers, ops, touch_tier, append_tier):
+    options = client_options(profile)
+    client = AsyncIOMotorClient(BENCH_MONGO_URL, **options)
+    db = client[BENCH_DB_NAME]
+    await client.drop_database(BENCH_DB_NAME)
+    conversations = [str(uuid.uuid4()) for _ in range(workers)]
+    await seed(db, conversations)
+
+    timings = {"get": [], "history": [], "append": [], "touch": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(db, cid, ops, timings, touch_tier, append_tier) for cid in conversations
+    ))
+    elapsed = time.perf_counter() - start
+
+    await client.drop_database(BENCH_DB_NAME)
+    client.close()
+
+    print(f"\n{profile} (touch={touch_tier}, append={append_tier}) {options}")
+    print(f"  {workers * ops / elapsed:>8.0f} chat round-trips/s over {elapsed:.2f}s")
+    for name, values in timings.items():
+        ms = [v * 1000 for v in values]
+        print(
+            f"  {name:<8} p50 {statistics.median(ms):6.2f} ms"
+            f"  p95 {percentile(ms, 0.95):6.2f} ms  p99 {percentile(ms, 0.99):6.2f} ms"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(","):
+        await run(profile, args.workers, args.ops, "fast", "durable")
+    # Cost of the tiers themselves: everything majority vs everything w=1
+    await run(args.profiles.split(",")[0], args.workers, args.ops, "durable", "durable")
+    await run(args.profiles.split(",")[0], args.workers, args.ops, "fast", "fast")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
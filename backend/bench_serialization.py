@@ -0,0 +1,102 @@
+"""
+Microbenchmark: per-message serialization cost of a 10k-message conversation,
+pydantic round-trip vs the trusted fast path (optionally gzip/br compressed)
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from models import Conversation, Message
+from starlette.requests import Request
+
+from serialization import brotli, json_response, orjson, streaming_document_response
+
+MESSAGE_COUNT = 10_000
+ROUNDS = 5
+
+
+def make_documents(count: int):
+    """Documents shaped like what Mongo returns (naive UTC datetimes, no _id)"""
+    conversation_id = str(uuid.uuid4())
+    started = datetime.now(timezone.utc).replace(tzinfo=None)
+    conversation = {
+        "id": conversation_id,
+        "title": "Benchmark note",
+        "created_at": started,
+        "updated_at": started,
+    }
+    messages = [
+        {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 12,
+            "created_at": started + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+    return conversation, messages
+
+
+def pydantic_path(conversation: dict, messages: list) -> bytes:
+    # What the endpoint did before: validate into models, then FastAPI re-encodes
+    conversation_obj = Conversation(**conversation)
+    conversation_obj.messages = [Message(**msg) for msg in messages]
+    return json.dumps(jsonable_encoder(conversation_obj)).encode("utf-8")
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def make_request(encoding=None) -> Request:
+    headers = [(b"accept-encoding", encoding.encode("latin-1"))] if encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+async def fast_path(conversation: dict, messages: list, encoding=None) -> bytes:
+    # The streaming response the conversation endpoint returns, drained in memory
+    response = streaming_document_response(make_request(encoding), conversation, "messages", _aiter(messages))
+    return b"".join([part async for part in response.body_iterator])
+
+
+def one_shot_path(conversation: dict, messages: list, encoding=None) -> bytes:
+    return json_response(make_request(encoding), {**conversation, "messages": messages}).body
+
+
+def report(name: str, seconds: float, size: int):
+    per_message_us = seconds / MESSAGE_COUNT * 1e6
+    print(f"{name:<24} {seconds * 1000:8.1f} ms  {per_message_us:6.2f} us/msg  {size / 1024:8.0f} KiB")
+
+
+def best_of(fn):
+    best, result = float("inf"), None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    conversation, messages = make_documents(MESSAGE_COUNT)
+    print(f"{MESSAGE_COUNT} messages, best of {ROUNDS} rounds (orjson={'yes' if orjson else 'no'})\n")
+
+    seconds, body = best_of(lambda: pydantic_path(conversation, messages))
+    report("pydantic + jsonable", seconds, len(body))
+
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        seconds, body = best_of(lambda: asyncio.run(fast_path(conversation, messages, encoding)))
+        report(f"trusted {encoding or 'identity'}", seconds, len(body))
+        seconds, body = best_of(lambda: one_shot_path(conversation, messages, encoding))
+        report(f"one-shot {encoding or 'identity'}", seconds, len(body))
+
+
+if __name__ == "__main__":
+    main()
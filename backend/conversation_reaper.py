@@ -0,0 +1,82 @@
+"""
+Background purge of soft-deleted conversations.
+
+Deleting a conversation only flags it; this reaper removes its messages in
+small, throttled batches and then drops the conversation document. It
+waits REAPER_GRACE_SECONDS after the delete, so a chat request that
+checked the conversation was live just before it was deleted has saved
+its messages by the time they are purged. With
+CONVERSATION_RETENTION_DAYS set, it also soft-deletes conversations that
+have not been updated within the retention window.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+REAPER_INTERVAL_SECONDS = float(os.environ.get('REAPER_INTERVAL_SECONDS', '30'))
+REAPER_BATCH_SIZE = int(os.environ.get('REAPER_BATCH_SIZE', '500'))
+# Pause between batches so purges never compete with live traffic for Mongo
+REAPER_BATCH_PAUSE_SECONDS = float(os.environ.get('REAPER_BATCH_PAUSE_SECONDS', '0.2'))
+# Longer than a chat request takes to save its messages after its live check
+REAPER_GRACE_SECONDS = float(os.environ.get('REAPER_GRACE_SECONDS', '300'))
+CONVERSATION_RETENTION_DAYS = float(os.environ.get('CONVERSATION_RETENTION_DAYS', '0'))
+
+
+class ConversationReaper:
+    def __init__(self, conversation_store, message_store):
+        self.conversation_store = conversation_store
+        self.message_store = message_store
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Conversation reaper started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Conversation reaper pass failed: {str(e)}")
+            await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+
+    async def run_once(self) -> int:
+        """
+        Apply retention, then purge soft-deleted conversations; returns the
+        number of conversations fully removed
+        """
+        if CONVERSATION_RETENTION_DAYS > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=CONVERSATION_RETENTION_DAYS)
+            expired = await self.conversation_store.expire_before(cutoff)
+            if expired:
+                logger.info(f"Retention expired {expired} conversations")
+
+        purged = 0
+        deleted_before = datetime.now(timezone.utc) - timedelta(seconds=REAPER_GRACE_SECONDS)
+        for conversation_id in await self.conversation_store.deleted_ids(limit=100, deleted_before=deleted_before):
+            removed = 0
+            while True:
+                deleted = await self.message_store.delete_batch(conversation_id, REAPER_BATCH_SIZE)
+                removed += deleted
+                if deleted < REAPER_BATCH_SIZE:
+                    break
+                await asyncio.sleep(REAPER_BATCH_PAUSE_SECONDS)
+            await self.conversation_store.purge(conversation_id)
+            purged += 1
+            logger.info(f"Purged conversation {conversation_id} ({removed} message documents)")
+            await asyncio.sleep(REAPER_BATCH_PAUSE_SECONDS)
+        return purged
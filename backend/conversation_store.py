@@ -0,0 +1,106 @@
+"""
+Conversation documents: the note list, titles, timestamps and the rolling
+chat summary
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db_indexes import SAMPLE_ID, SAMPLE_TIME, register_indexes, register_query
+from mongo_config import for_write
+
+SUMMARY_FIELDS = {"_id": 0, "id": 1, "title": 1, "updated_at": 1}
+DETAIL_FIELDS = {"_id": 0, "id": 1, "title": 1, "created_at": 1, "updated_at": 1}
+CHAT_FIELDS = {"_id": 0, "id": 1, "summary": 1, "summary_until": 1}
+
+# Soft-deleted conversations carry `deleted_at` until the reaper purges them
+LIVE = {"deleted_at": None}
+
+register_indexes("conversations", [
+    IndexModel([("id", ASCENDING)], unique=True),
+    IndexModel([("deleted_at", ASCENDING), ("updated_at", DESCENDING)]),
+])
+
+
+def by_id_filter(conversation_id: str) -> dict:
+    return {"id": conversation_id, **LIVE}
+
+
+def deleted_filter(deleted_before: datetime) -> dict:
+    return {"deleted_at": {"$lt": deleted_before}}
+
+
+def purge_filter(conversation_id: str) -> dict:
+    return {"id": conversation_id, "deleted_at": {"$ne": None}}
+
+
+def expired_filter(cutoff: datetime) -> dict:
+    return {"updated_at": {"$lt": cutoff}, **LIVE}
+
+
+register_query("conversations.list", "conversations", LIVE, sort=[("updated_at", -1)], projection=SUMMARY_FIELDS)
+register_query("conversations.by_id", "conversations", by_id_filter(SAMPLE_ID), projection=DETAIL_FIELDS)
+register_query("conversations.deleted", "conversations", deleted_filter(SAMPLE_TIME), projection={"_id": 0, "id": 1})
+register_query("conversations.purge", "conversations", purge_filter(SAMPLE_ID))
+register_query("conversations.expired", "conversations", expired_filter(SAMPLE_TIME), projection={"_id": 0, "id": 1})
+
+
+class ConversationStore:
+    def __init__(self, db):
+        self.collection = db.conversations
+
+    async def create(self, conversation: dict):
+        await for_write(self.collection, "conversation.create").insert_one(dict(conversation))
+
+    async def list_summaries(self, limit: int = 1000) -> List[dict]:
+        return await self.collection.find(LIVE, SUMMARY_FIELDS).sort("updated_at", -1).to_list(limit)
+
+    async def get(self, conversation_id: str, fields: dict = DETAIL_FIELDS) -> Optional[dict]:
+        return await self.collection.find_one(by_id_filter(conversation_id), fields)
+
+    async def is_live(self, conversation_id: str) -> bool:
+        return await self.get(conversation_id, {"_id": 0, "id": 1}) is not None
+
+    async def soft_delete(self, conversation_ids: List[str]) -> int:
+        """
+        Hide conversations immediately; their messages are purged later by
+        the reaper
+        """
+        result = await for_write(self.collection, "conversation.delete").update_many(
+            {"id": {"$in": conversation_ids}, **LIVE},
+            {"$set": {"deleted_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    async def expire_before(self, cutoff: datetime) -> int:
+        """Soft-delete conversations not updated since `cutoff` (retention)"""
+        result = await for_write(self.collection, "conversation.delete").update_many(
+            expired_filter(cutoff),
+            {"$set": {"deleted_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    async def deleted_ids(self, limit: int, deleted_before: datetime) -> List[str]:
+        """Conversations soft-deleted before `deleted_before`"""
+        docs = await self.collection.find(
+            deleted_filter(deleted_before), {"_id": 0, "id": 1}
+        ).to_list(limit)
+        return [doc["id"] for doc in docs]
+
+    async def purge(self, conversation_id: str):
+        """Hard-delete a soft-deleted conversation once its messages are gone"""
+        await for_write(self.collection, "conversation.purge").delete_one(purge_filter(conversation_id))
+
+    async def touch(self, conversation_id: str, title: Optional[str] = None):
+        """Bump updated_at, optionally setting the title"""
+        update = {"updated_at": datetime.now(timezone.utc)}
+        if title is not None:
+            update["title"] = title
+        await for_write(self.collection, "conversation.touch").update_one({"id": conversation_id}, {"$set": update})
+
+    async def set_summary(self, conversation_id: str, summary: Optional[str], summary_until: datetime):
+        await for_write(self.collection, "conversation.summary").update_one(
+            {"id": conversation_id},
+            {"$set": {"summary": summary, "summary_until": summary_until}}
+        )
@@ -1,5 +1,9 @@
 """
-Create MongoDB indexes for optimal query performance
+Create MongoDB indexes for optimal query performance.
+
+Index declarations live next to the data-access code (see db_indexes.py)
+and are also applied at server startup; this script applies them once
+without starting the API.
 """
 import asyncio
 import os
@@ -7,6 +11,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
 
+from db_indexes import INDEXES, apply_indexes
+import conversation_store  # noqa: F401 - registers indexes
+import message_store  # noqa: F401
+import evaluation_store  # noqa: F401
+import admission  # noqa: F401
+import question_cache  # noqa: F401
+import idempotency_store  # noqa: F401
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -18,21 +30,12 @@ async def create_indexes():
     
     print("Creating indexes...")
     
-    # Conversations collection indexes
-    await db.conversations.create_index('id', unique=True)
-    print("✓ Created unique index on conversations.id")
-    
-    await db.conversations.create_index([('updated_at', -1)])
-    print("✓ Created index on conversations.updated_at")
-    
-    # Messages collection indexes
-    await db.messages.create_index('conversation_id')
-    print("✓ Created index on messages.conversation_id")
-    
-    await db.messages.create_index([('conversation_id', 1), ('created_at', 1)])
-    print("✓ Created compound index on messages (conversation_id, created_at)")
+    created = await apply_indexes(db)
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            print(f"✓ {collection}: {index.document['name']}")
     
-    print("\nAll indexes created successfully!")
+    print(f"\nAll indexes created successfully! ({len(created)} applied)")
     client.close()
 
 if __name__ == "__main__":
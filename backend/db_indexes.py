@@ -0,0 +1,121 @@
+"""
+Registry of Mongo indexes and query shapes.
+
+Data-access modules declare the indexes they need and the queries they
+run, next to the code that runs them (built with the same filter
+functions, fed SAMPLE_ID / SAMPLE_TIME). Indexes are applied idempotently at
+startup, and `verify_indexes.py` explains every registered query shape to
+catch collection scans and in-memory sorts before deploy.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Placeholder values for registering a shape through the filter builder the
+# code itself uses; only the shape matters to the planner
+SAMPLE_ID = "x"
+SAMPLE_TIME = datetime(2000, 1, 1)
+
+# Plan stages that mean a query is not served by an index
+BAD_STAGES = {"COLLSCAN", "SORT"}
+
+
+@dataclass
+class QueryShape:
+    name: str
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    projection: Optional[dict] = None
+    pipeline: Optional[list] = None
+
+
+INDEXES: Dict[str, List[IndexModel]] = {}
+QUERIES: List[QueryShape] = []
+
+
+def register_indexes(collection: str, indexes: List[IndexModel]):
+    INDEXES.setdefault(collection, []).extend(indexes)
+
+
+def register_query(name: str, collection: str, filter: dict, sort: Optional[list] = None, projection: Optional[dict] = None):
+    QUERIES.append(QueryShape(name, collection, filter, sort, projection))
+
+
+def register_pipeline(name: str, collection: str, pipeline: List[dict]):
+    QUERIES.append(QueryShape(name, collection, {}, pipeline=pipeline))
+
+
+async def apply_indexes(db) -> List[str]:
+    """
+    Create all registered indexes; existing identical indexes are a no-op
+    """
+    created = []
+    for collection, indexes in INDEXES.items():
+        try:
+            created.extend(await db[collection].create_indexes(indexes))
+        except Exception as e:
+            # A conflicting index must not stop the app from starting
+            logger.error(f"Failed to apply indexes on {collection}: {str(e)}")
+    logger.info(f"Applied {len(created)} indexes across {len(INDEXES)} collections")
+    return created
+
+
+def _stages(plan) -> List[str]:
+    """All stage names in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_stages(value))
+    return stages
+
+
+def _winning_plan(explained: dict) -> dict:
+    """The query planner's winning plan from a find or aggregate explain"""
+    if "queryPlanner" in explained:
+        return explained["queryPlanner"].get("winningPlan", {})
+    for stage in explained.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"].get("queryPlanner", {}).get("winningPlan", {})
+    return {}
+
+
+async def explain_query(db, shape: QueryShape) -> List[str]:
+    if shape.pipeline:
+        # Stages after $group sort and trim groups, never documents, so only
+        # the part up to the first $group has to be index-backed
+        pipeline = list(shape.pipeline)
+        for i, stage in enumerate(pipeline):
+            if "$group" in stage:
+                pipeline = pipeline[:i + 1]
+                break
+        explained = await db.command("aggregate", shape.collection, pipeline=pipeline, explain=True)
+        return _stages(_winning_plan(explained))
+    cursor = db[shape.collection].find(shape.filter, shape.projection)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    explained = await cursor.explain()
+    return _stages(_winning_plan(explained))
+
+
+async def verify_query_plans(db) -> Dict[str, List[str]]:
+    """
+    Explain every registered query shape; returns the plan stages of each
+    failing shape (empty when all queries are index-backed)
+    """
+    failures = {}
+    for shape in QUERIES:
+        stages = await explain_query(db, shape)
+        if BAD_STAGES.intersection(stages):
+            failures[shape.name] = stages
+    return failures
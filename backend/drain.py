@@ -0,0 +1,66 @@
+"""
+Graceful drain for rolling deploys.
+
+Model calls and the writes that persist their results run as protected
+tasks: they survive client disconnects and request cancellation, and a
+draining instance waits for them (up to DRAIN_TIMEOUT_SECONDS) before the
+Mongo client is closed. While draining, admission control rejects new
+requests with 503 so load balancers and clients move to other instances.
+
+`POST /api/admin/drain` is authorized by DRAIN_ADMIN_TOKEN, kept separate
+from the profiler's token so deploy hooks do not switch profiling on.
+"""
+import os
+import hmac
+import asyncio
+import logging
+from typing import Awaitable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT_SECONDS = float(os.environ.get('DRAIN_TIMEOUT_SECONDS', '25'))
+DRAIN_ADMIN_TOKEN = os.environ.get('DRAIN_ADMIN_TOKEN', '')
+
+
+def is_drain_admin(token: Optional[str]) -> bool:
+    return bool(DRAIN_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, DRAIN_ADMIN_TOKEN)
+
+
+class DrainController:
+    def __init__(self, admission):
+        self.admission = admission
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def draining(self) -> bool:
+        return self.admission.draining
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def protect(self, work: Awaitable) -> Awaitable:
+        """
+        Run `work` to completion even if the awaiting request is cancelled
+        """
+        task = asyncio.ensure_future(work)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return asyncio.shield(task)
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> int:
+        """
+        Stop admitting requests and wait for protected work; returns the
+        number of tasks still running at the deadline
+        """
+        if not self.admission.draining:
+            self.admission.draining = True
+            logger.info(f"Draining: waiting for {len(self._tasks)} in-flight model calls")
+        if not self._tasks:
+            return 0
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"Drain deadline reached with {len(pending)} model calls still running")
+        else:
+            logger.info("Drain complete")
+        return len(pending)
@@ -0,0 +1,123 @@
+"""
+Persisted answer evaluations with per-user, per-role progress rollups.
+
+Every evaluation is stored once, and the matching rollup document is
+updated in the same request with `$inc`, so progress stats are a single
+document read instead of an aggregation over the full history.
+"""
+import re
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db_indexes import register_indexes, register_query
+from mongo_config import for_write
+
+# Score distribution buckets: 0-1, 2-3, 4-5, 6-7, 8-10
+SCORE_BUCKETS = [(0, 2, "0-1"), (2, 4, "2-3"), (4, 6, "4-5"), (6, 8, "6-7"), (8, 11, "8-10")]
+WEAKEST_COUNT = 3
+
+_KEY_RE = re.compile(r"[^a-z0-9_ -]")
+
+register_indexes("evaluations", [
+    IndexModel([("user_id", ASCENDING), ("role", ASCENDING), ("created_at", DESCENDING)]),
+])
+register_indexes("evaluation_rollups", [IndexModel([("user_id", ASCENDING)])])
+register_query("evaluation_rollups.by_id", "evaluation_rollups", {"_id": "user:role"})
+register_query("evaluation_rollups.by_user", "evaluation_rollups", {"user_id": "user"})
+
+
+def _key(value: str) -> str:
+    """Normalize roles/categories into safe, stable field and id parts"""
+    return _KEY_RE.sub("", " ".join(str(value).lower().split())) or "general"
+
+
+def _bucket(score: float) -> str:
+    for low, high, label in SCORE_BUCKETS:
+        if low <= score < high:
+            return label
+    return SCORE_BUCKETS[-1][2]
+
+
+def _score(evaluation: dict) -> float:
+    try:
+        score = float(evaluation.get("score", 0))
+    except (TypeError, ValueError):
+        score = 0.0
+    return min(10.0, max(0.0, score))
+
+
+class EvaluationStore:
+    def __init__(self, db):
+        self.evaluations = db.evaluations
+        self.rollups = db.evaluation_rollups
+
+    async def record(self, user_id: str, role: str, question: dict, evaluation: dict) -> dict:
+        """
+        Store an evaluation and fold it into the user's rollup for the role
+        """
+        score = _score(evaluation)
+        question = question if isinstance(question, dict) else {"text": str(question)}
+        category = _key(question.get("category") or question.get("difficulty") or "general")
+        role_key = _key(role)
+
+        document = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "role": role,
+            "question": question.get("text", ""),
+            "category": category,
+            "score": score,
+            "feedback": evaluation.get("feedback"),
+            "created_at": datetime.now(timezone.utc),
+        }
+
+        await asyncio.gather(
+            for_write(self.evaluations, "evaluation.record").insert_one(document),
+            for_write(self.rollups, "evaluation.record").update_one(
+                {"_id": f"{user_id}:{role_key}"},
+                {
+                    "$inc": {
+                        "count": 1,
+                        "score_sum": score,
+                        f"buckets.{_bucket(score)}": 1,
+                        f"categories.{category}.count": 1,
+                        f"categories.{category}.score_sum": score,
+                    },
+                    "$set": {"updated_at": document["created_at"]},
+                    "$setOnInsert": {"user_id": user_id, "role": role},
+                },
+                upsert=True
+            ),
+        )
+        return document
+
+    async def stats(self, user_id: str, role: Optional[str] = None) -> List[dict]:
+        """
+        Progress stats from the rollups (one document per role)
+        """
+        if role:
+            rollup = await self.rollups.find_one({"_id": f"{user_id}:{_key(role)}"})
+            rollups = [rollup] if rollup else []
+        else:
+            rollups = await self.rollups.find({"user_id": user_id}).to_list(100)
+        return [self._summarize(rollup) for rollup in rollups]
+
+    def _summarize(self, rollup: dict) -> dict:
+        categories = {
+            name: round(values["score_sum"] / values["count"], 2)
+            for name, values in rollup.get("categories", {}).items()
+            if values.get("count")
+        }
+        return {
+            "role": rollup.get("role"),
+            "count": rollup.get("count", 0),
+            "mean_score": round(rollup["score_sum"] / rollup["count"], 2) if rollup.get("count") else None,
+            "distribution": {label: rollup.get("buckets", {}).get(label, 0) for _, _, label in SCORE_BUCKETS},
+            "categories": categories,
+            "weakest_categories": sorted(categories, key=categories.get)[:WEAKEST_COUNT],
+            "updated_at": rollup.get("updated_at"),
+        }
@@ -0,0 +1,95 @@
+"""
+Stored results for requests sent with an `Idempotency-Key` header.
+
+The first request with a key claims it (`pending`) and stores its result
+when done; a retry with the same key gets the stored result instead of a
+second model call. A claim whose owner died (e.g. an instance killed
+mid-deploy) can be taken over after IDEMPOTENCY_PENDING_SECONDS.
+
+Claims store a hash of the request body; reusing a key with a different
+body is a client bug and is rejected rather than answered with the stored
+result of another request.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import register_indexes
+from mongo_config import for_write
+
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24'))
+IDEMPOTENCY_PENDING_SECONDS = float(os.environ.get('IDEMPOTENCY_PENDING_SECONDS', '120'))
+# Retry-After sent with 409 while the original request is still running
+IDEMPOTENCY_POLL_SECONDS = int(os.environ.get('IDEMPOTENCY_POLL_SECONDS', '2'))
+MAX_KEY_LENGTH = 200
+
+register_indexes("idempotency_keys", [
+    IndexModel([("created_at", ASCENDING)], expireAfterSeconds=int(IDEMPOTENCY_TTL_HOURS * 3600)),
+])
+
+
+class IdempotencyConflict(Exception):
+    """Another request with the same key is still running"""
+
+
+class IdempotencyMismatch(Exception):
+    """The key was already used with a different request body"""
+
+
+def request_hash(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, db):
+        self.collection = db.idempotency_keys
+
+    async def claim(self, scope: str, key: str, body_hash: str) -> Optional[dict]:
+        """
+        Claim `key` for this request; returns the stored response if a
+        previous request with the key already completed
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+        now = datetime.now(timezone.utc)
+        doc_id = f"{scope}:{key}"
+        collection = for_write(self.collection, "idempotency.claim")
+        try:
+            await collection.insert_one({"_id": doc_id, "status": "pending", "request_hash": body_hash, "created_at": now})
+            return None
+        except DuplicateKeyError:
+            pass
+
+        existing = await self.collection.find_one({"_id": doc_id})
+        if existing and existing.get("request_hash", body_hash) != body_hash:
+            raise IdempotencyMismatch(f"Idempotency-Key {key} was already used with a different request")
+        if existing and existing["status"] == "done":
+            return existing["response"]
+        stale = await collection.find_one_and_update(
+            {
+                "_id": doc_id,
+                "status": "pending",
+                "created_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS)},
+            },
+            {"$set": {"created_at": now}}
+        )
+        if stale is None:
+            raise IdempotencyConflict(f"Request {key} is already in progress")
+        return None
+
+    async def complete(self, scope: str, key: str, response: dict):
+        await for_write(self.collection, "idempotency.complete").update_one(
+            {"_id": f"{scope}:{key}"},
+            {"$set": {"status": "done", "response": response, "created_at": datetime.now(timezone.utc)}}
+        )
+
+    async def release(self, scope: str, key: str):
+        """Drop a claim whose request failed so the client can retry"""
+        await for_write(self.collection, "idempotency.claim").delete_one(
+            {"_id": f"{scope}:{key}", "status": "pending"}
+        )
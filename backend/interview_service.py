@@ -1,70 +1,87 @@
 import os
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 from dotenv import load_dotenv
 import logging
 import json
 import uuid
+from typing import Optional
+
+from prompt_builder import (
+    build_prompt,
+    QUESTION_GEN_SYSTEM, QUESTION_GEN as QUESTION_GEN_PROMPT,
+    EVALUATION_SYSTEM, EVALUATION as EVALUATION_PROMPT,
+    MOCK_SYSTEM, MOCK_CONTINUE,
+)
+from model_router import model_router, QUESTION_GEN, EVALUATION, MOCK_FEEDBACK
+from llm_cassette import cassette
+from question_index import question_bank, NotEnoughQuestions
+from question_cache import question_cache
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Largest set a client may ask for; the fallback list covers it in full
+MAX_QUESTION_COUNT = 10
+
 class InterviewService:
     def __init__(self):
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not self.api_key:
+        if not self.api_key and not cassette.offline:
             raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
         logger.info("Interview Service initialized with Emergent LLM Key")
     
-    async def generate_questions(self, role: str, count: int = 5, difficulty: str = 'mixed') -> list:
+    async def generate_questions(self, role: str, count: int = 5, difficulty: str = 'mixed', session_id: Optional[str] = None) -> list:
         """
-        Generate interview questions for a specific role
+        Generate interview questions for a specific role.
+
+        Pre-generated sets from the warm-up cache are used when available.
+        Near-duplicates and questions already shown to `session_id` are
+        dropped, and short sets are topped up from the question bank; a
+        cached set that still comes up short is replaced by a fresh one.
         """
         try:
-            session_id = f"question_gen_{uuid.uuid4()}"
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message="You are an expert technical interviewer. Generate relevant, thoughtful interview questions."
-            )
-            chat.with_model("openai", "gpt-4o-mini")
-            
-            prompt = f"""Generate {count} interview questions for a {role} position.
-            Difficulty level: {difficulty}
-            
-            Return ONLY a JSON array with this exact format:
-            [
-              {{
-                "text": "question text",
-                "difficulty": "Easy/Medium/Hard",
-                "context": "brief context if needed"
-              }}
-            ]
-            
-            Make questions relevant, practical, and varied in difficulty."""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
-            
-            # Parse JSON from response
-            try:
-                # Extract JSON from response (handle markdown code blocks)
-                response_text = response.strip()
-                if '```json' in response_text:
-                    response_text = response_text.split('```json')[1].split('```')[0].strip()
-                elif '```' in response_text:
-                    response_text = response_text.split('```')[1].split('```')[0].strip()
-                
-                questions = json.loads(response_text)
-                logger.info(f"Generated {len(questions)} questions for {role}")
-                return questions
-            except json.JSONDecodeError:
-                # Fallback: create basic questions
-                logger.warning("Failed to parse JSON, using fallback questions")
-                return self._get_fallback_questions(role, count)
-            
+            cached = await question_cache.take(role, difficulty, count)
+            if cached:
+                try:
+                    return question_bank.select(role, cached, count, session_id, reuse_seen=False)
+                except NotEnoughQuestions:
+                    logger.info(f"Cached {role} set has too few unseen questions, generating")
+
+            questions = await self.generate_question_set(role, count, difficulty)
+            # Keep what the model returned; generic questions only fill the gap
+            padding = self._get_fallback_questions(role, MAX_QUESTION_COUNT)
+            return question_bank.select(role, questions, count, session_id, padding=padding)
+        except json.JSONDecodeError:
+            # Fallback: create basic questions
+            logger.warning("Failed to parse JSON, using fallback questions")
+            return self._get_fallback_questions(role, count)
         except Exception as e:
             logger.error(f"Error generating questions: {str(e)}")
             return self._get_fallback_questions(role, count)
+
+    async def generate_question_set(self, role: str, count: int, difficulty: str) -> list:
+        """
+        One fresh question set from the model; raises instead of falling back
+        (used directly by the warm-up pipeline)
+        """
+        prompt = build_prompt(QUESTION_GEN_SYSTEM, QUESTION_GEN_PROMPT, count=count, role=role, difficulty=difficulty)
+        response = await model_router.send_message(
+            QUESTION_GEN,
+            session_id=f"question_gen_{uuid.uuid4()}",
+            system_message=prompt.system_message,
+            text=prompt.text
+        )
+        logger.info(f"Question generation prompt_tokens={prompt.prompt_tokens}")
+
+        # Extract JSON from response (handle markdown code blocks)
+        response_text = response.strip()
+        if '```json' in response_text:
+            response_text = response_text.split('```json')[1].split('```')[0].strip()
+        elif '```' in response_text:
+            response_text = response_text.split('```')[1].split('```')[0].strip()
+
+        questions = json.loads(response_text)
+        logger.info(f"Generated {len(questions)} questions for {role}")
+        return questions
     
     async def evaluate_answer(self, question: dict, answer: str, role: str) -> dict:
         """
@@ -72,32 +89,15 @@ class InterviewService:
         """
         try:
             session_id = f"eval_{uuid.uuid4()}"
-            chat = LlmChat(
-                api_key=self.api_key,
+            question_text = question.get('text', question) if isinstance(question, dict) else question
+            prompt = build_prompt(EVALUATION_SYSTEM, EVALUATION_PROMPT, role=role, question=question_text, answer=answer)
+            response = await model_router.send_message(
+                EVALUATION,
                 session_id=session_id,
-                system_message="You are an expert interview evaluator. Provide constructive, specific feedback."
+                system_message=prompt.system_message,
+                text=prompt.text
             )
-            chat.with_model("openai", "gpt-4o-mini")
-            
-            question_text = question.get('text', question) if isinstance(question, dict) else question
-            
-            prompt = f"""Evaluate this interview answer for a {role} position.
-            
-            Question: {question_text}
-            Answer: {answer}
-            
-            Provide evaluation in this JSON format:
-            {{
-              "score": 0-10,
-              "feedback": "detailed feedback",
-              "strengths": ["strength 1", "strength 2"],
-              "improvements": ["improvement 1", "improvement 2"]
-            }}
-            
-            Be specific, constructive, and encouraging."""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            logger.info(f"Evaluation prompt_tokens={prompt.prompt_tokens}")
             
             # Parse JSON from response
             try:
@@ -116,7 +116,8 @@ class InterviewService:
                     "score": 7,
                     "feedback": "Your answer demonstrates understanding. Keep practicing!",
                     "strengths": ["Clear communication"],
-                    "improvements": ["Add more specific examples"]
+                    "improvements": ["Add more specific examples"],
+                    "fallback": True
                 }
             
         except Exception as e:
@@ -129,13 +130,6 @@ class InterviewService:
         """
         try:
             session_id = f"mock_{uuid.uuid4()}"
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=f"You are conducting a professional interview for a {role} position. Be conversational, ask relevant questions, and provide feedback."
-            )
-            chat.with_model("openai", "gpt-4o-mini")
-            
             greeting = f"Hello! Thank you for joining us today. I'm excited to learn more about your background and experience for the {role} position. Let's begin with our first question."
             
             first_question = f"Can you tell me about yourself and why you're interested in this {role} position?"
@@ -155,13 +149,6 @@ class InterviewService:
         Continue mock interview with next question
         """
         try:
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=f"You are conducting a professional interview for a {role} position."
-            )
-            chat.with_model("openai", "gpt-4o-mini")
-            
             # Check if we should end the interview (after 5 questions)
             if question_count >= 4:
                 return {
@@ -169,17 +156,14 @@ class InterviewService:
                     "closing_message": "Thank you for your time today. You've provided great answers. We'll be in touch soon regarding next steps. Best of luck!"
                 }
             
-            prompt = f"""Based on the candidate's previous answer: "{answer}"
-            
-            1. Provide brief feedback (1-2 sentences)
-            2. Ask the next relevant interview question for a {role}
-            
-            Format your response as:
-            FEEDBACK: [your feedback]
-            QUESTION: [next question]"""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            prompt = build_prompt(MOCK_SYSTEM, MOCK_CONTINUE, role=role, answer=answer)
+            response = await model_router.send_message(
+                MOCK_FEEDBACK,
+                session_id=session_id,
+                system_message=prompt.system_message,
+                text=prompt.text
+            )
+            logger.info(f"Mock interview prompt_tokens={prompt.prompt_tokens}")
             
             # Parse response
             parts = response.split('QUESTION:')
@@ -204,6 +188,11 @@ class InterviewService:
             {"text": "Describe a challenging project you've worked on.", "difficulty": "Medium"},
             {"text": "How do you stay updated with industry trends?", "difficulty": "Easy"},
             {"text": "Where do you see yourself in 5 years?", "difficulty": "Easy"},
+            {"text": f"What drew you to working as a {role}?", "difficulty": "Easy"},
+            {"text": "Tell me about a time you disagreed with a teammate and how you resolved it.", "difficulty": "Medium"},
+            {"text": "Describe a mistake you made at work and what you learned from it.", "difficulty": "Medium"},
+            {"text": "How do you prioritize when several deadlines compete?", "difficulty": "Medium"},
+            {"text": f"What is the hardest problem you have solved as a {role}?", "difficulty": "Hard"},
         ]
         return base_questions[:count]
 
@@ -0,0 +1,128 @@
+"""
+Record/replay cassettes for LLM calls.
+
+In `record` mode every successful call is appended to a gzip-compressed
+JSON Lines file together with its latency. In `replay` mode calls are
+answered from the cassette, deterministically and without network access,
+optionally sleeping for the recorded latency scaled by LLM_CASSETTE_SPEED
+(1 = original timing, 0 = instant). `auto` replays hits and records misses.
+Cassettes whose path does not end in `.gz` are read and written as plain
+JSON Lines, which keeps committed test fixtures reviewable.
+"""
+import os
+import gzip
+import json
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CASSETTE_MODE = os.environ.get('LLM_CASSETTE_MODE', 'off')
+LLM_CASSETTE_PATH = os.environ.get('LLM_CASSETTE_PATH', str(Path(__file__).parent / 'cassettes' / 'llm.jsonl.gz'))
+LLM_CASSETTE_SPEED = float(os.environ.get('LLM_CASSETTE_SPEED', '0'))
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def cassette_key(task: str, model: str, system_message: str, text: str) -> str:
+    """Stable key for a call to one model"""
+    digest = hashlib.sha256()
+    for part in (task, model, system_message, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _open(path: str, mode: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, mode, encoding="utf-8")
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Recorded calls in the order they were made"""
+    if not os.path.exists(path):
+        return
+    with _open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Cassette:
+    def __init__(self, path: str = LLM_CASSETTE_PATH, mode: str = LLM_CASSETTE_MODE, speed: float = LLM_CASSETTE_SPEED):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._records: Dict[str, List[dict]] = defaultdict(list)
+        # Identical prompts replay their recorded responses in order
+        self._cursor: Dict[str, int] = defaultdict(int)
+        if mode in ('replay', 'auto'):
+            for record in iter_records(path):
+                self._records[record["key"]].append(record)
+            logger.info(f"Loaded {sum(map(len, self._records.values()))} LLM cassette records from {path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ('record', 'replay', 'auto')
+
+    @property
+    def recording(self) -> bool:
+        return self.mode in ('record', 'auto')
+
+    @property
+    def offline(self) -> bool:
+        """Every call is answered from the cassette; no API key is needed"""
+        return self.mode == 'replay'
+
+    async def replay(self, task: str, models: List[str], system_message: str, text: str) -> Optional[str]:
+        """
+        Return the response recorded for the first of `models` that has one,
+        or None on a miss in `auto`/`record` mode
+        """
+        if self.mode not in ('replay', 'auto'):
+            return None
+        for model in models:
+            key = cassette_key(task, model, system_message, text)
+            if self._records.get(key):
+                break
+        else:
+            if self.mode == 'replay':
+                raise CassetteMiss(f"No cassette record for {task} call to any of {models}")
+            return None
+        records = self._records[key]
+        record = records[self._cursor[key] % len(records)]
+        self._cursor[key] += 1
+        if self.speed > 0:
+            await asyncio.sleep(record["latency_ms"] / 1000 * self.speed)
+        return record["response"]
+
+    async def record(self, task: str, model: str, system_message: str, text: str, response: str, latency_ms: float):
+        record = {
+            "key": cassette_key(task, model, system_message, text),
+            "task": task,
+            "model": model,
+            "system": system_message,
+            "prompt": text,
+            "response": response,
+            "latency_ms": round(latency_ms, 1),
+        }
+        # File I/O (and gzip) off the event loop
+        await asyncio.to_thread(self._append, record)
+        self._records[record["key"]].append(record)
+
+    def _append(self, record: dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Each append is its own gzip member; readers see one continuous stream
+        with _open(self.path, "at") as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+# Singleton instance
+cassette = Cassette()
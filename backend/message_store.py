@@ -0,0 +1,296 @@
+"""
+Message storage backends.
+
+`documents` keeps one Mongo document per message (the original layout).
+`buckets` packs each conversation's messages into fixed-size bucket
+documents (the Mongo bucket pattern), so a long note session is a handful
+of documents and index entries instead of thousands.
+"""
+import os
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import SAMPLE_ID, SAMPLE_TIME, register_indexes, register_query
+from mongo_config import for_write
+from serialization import MESSAGE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_STORAGE = os.environ.get('MESSAGE_STORAGE', 'documents')
+BUCKET_SIZE = int(os.environ.get('MESSAGE_BUCKET_SIZE', '200'))
+MESSAGE_PAGE_MAX = 200
+# Chat history loaded per turn; bounds the first turn of a long conversation
+# that has no rolling summary yet
+HISTORY_LOAD_MAX = int(os.environ.get('MESSAGE_HISTORY_LOAD_MAX', '200'))
+
+HISTORY_FIELDS = {"_id": 0, "role": 1, "content": 1, "created_at": 1}
+
+# Newest first, `id` breaking created_at ties (the page cursor order)
+NEWEST_FIRST = [("created_at", -1), ("id", -1)]
+BUCKETS_NEWEST_FIRST = [("first_at", -1)]
+
+
+def history_filter(conversation_id: str, since: Optional[datetime]) -> dict:
+    query = {"conversation_id": conversation_id}
+    if since:
+        query["created_at"] = {"$gt": since}
+    return query
+
+
+def page_filter(conversation_id: str, before: Optional[datetime], before_id: Optional[str]) -> dict:
+    query = {"conversation_id": conversation_id}
+    if before and before_id:
+        query["$or"] = [
+            {"created_at": {"$lt": before}},
+            {"created_at": before, "id": {"$lt": before_id}},
+        ]
+    elif before:
+        query["created_at"] = {"$lt": before}
+    return query
+
+
+def open_bucket_filter(conversation_id: str, bucket_size: int) -> dict:
+    return {"conversation_id": conversation_id, "open": True, "count": {"$lt": bucket_size}}
+
+
+def bucket_history_filter(conversation_id: str, since: Optional[datetime]) -> dict:
+    query = {"conversation_id": conversation_id}
+    if since:
+        # Only buckets that can still hold messages newer than `since`
+        query["last_at"] = {"$gt": since}
+    return query
+
+
+def bucket_page_filter(conversation_id: str, before: Optional[datetime], before_id: Optional[str]) -> dict:
+    query = {"conversation_id": conversation_id}
+    if before:
+        # A bucket starting exactly at `before` may hold its tied messages
+        query["first_at"] = {"$lte": before} if before_id else {"$lt": before}
+    return query
+
+
+register_indexes("messages", [
+    # `id` breaks created_at ties for the page cursor
+    IndexModel([("conversation_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+])
+register_query("messages.by_conversation", "messages", {"conversation_id": SAMPLE_ID}, sort=[("created_at", 1)])
+register_query("messages.history", "messages", history_filter(SAMPLE_ID, None), sort=NEWEST_FIRST)
+register_query("messages.history_since", "messages", history_filter(SAMPLE_ID, SAMPLE_TIME), sort=NEWEST_FIRST)
+register_query("messages.page_newest", "messages", page_filter(SAMPLE_ID, None, None), sort=NEWEST_FIRST)
+register_query("messages.page_before", "messages", page_filter(SAMPLE_ID, SAMPLE_TIME, None), sort=NEWEST_FIRST)
+register_query("messages.page", "messages", page_filter(SAMPLE_ID, SAMPLE_TIME, SAMPLE_ID), sort=NEWEST_FIRST)
+register_query("messages.purge_batch", "messages", {"conversation_id": SAMPLE_ID}, projection={"_id": 1})
+
+register_indexes("message_buckets", [
+    IndexModel([("conversation_id", ASCENDING), ("first_at", ASCENDING)]),
+    # At most one open (still filling) bucket per conversation
+    IndexModel(
+        [("conversation_id", ASCENDING)], unique=True,
+        partialFilterExpression={"open": True}, name="conversation_id_open_bucket"
+    ),
+])
+register_query("message_buckets.by_conversation", "message_buckets", {"conversation_id": SAMPLE_ID}, sort=[("first_at", 1)])
+register_query("message_buckets.open_bucket", "message_buckets", open_bucket_filter(SAMPLE_ID, BUCKET_SIZE))
+register_query(
+    "message_buckets.history", "message_buckets",
+    bucket_history_filter(SAMPLE_ID, None), sort=BUCKETS_NEWEST_FIRST
+)
+register_query(
+    "message_buckets.history_since", "message_buckets",
+    bucket_history_filter(SAMPLE_ID, SAMPLE_TIME), sort=BUCKETS_NEWEST_FIRST
+)
+register_query(
+    "message_buckets.page_newest", "message_buckets",
+    bucket_page_filter(SAMPLE_ID, None, None), sort=BUCKETS_NEWEST_FIRST
+)
+register_query(
+    "message_buckets.page_before", "message_buckets",
+    bucket_page_filter(SAMPLE_ID, SAMPLE_TIME, None), sort=BUCKETS_NEWEST_FIRST
+)
+register_query(
+    "message_buckets.page", "message_buckets",
+    bucket_page_filter(SAMPLE_ID, SAMPLE_TIME, SAMPLE_ID), sort=BUCKETS_NEWEST_FIRST
+)
+register_query("message_buckets.purge_batch", "message_buckets", {"conversation_id": SAMPLE_ID}, projection={"_id": 1})
+
+
+class DocumentMessageStore:
+    """One document per message in `messages`"""
+
+    def __init__(self, db):
+        self.collection = db.messages
+
+    async def append(self, message: dict):
+        await for_write(self.collection, "message.append").insert_one(dict(message))
+
+    def iter_messages(self, conversation_id: str) -> AsyncIterator[dict]:
+        return self.collection.find(
+            {"conversation_id": conversation_id}, MESSAGE_FIELDS
+        ).sort("created_at", 1)
+
+    async def history(
+        self, conversation_id: str, since: Optional[datetime] = None, limit: int = HISTORY_LOAD_MAX
+    ) -> List[dict]:
+        """The newest `limit` messages after `since`, oldest first"""
+        docs = await self.collection.find(history_filter(conversation_id, since), HISTORY_FIELDS).sort(
+            NEWEST_FIRST
+        ).limit(limit).to_list(limit)
+        return docs[::-1]
+
+    async def page(
+        self, conversation_id: str, before: Optional[datetime], limit: int, before_id: Optional[str] = None
+    ) -> Tuple[List[dict], bool]:
+        """
+        Up to `limit` messages ordered before the cursor (`before`, `before_id`)
+        (newest page when `before` is None), oldest first, and whether older
+        messages remain. Messages are ordered by (created_at, id), so messages
+        sharing a timestamp are never skipped.
+        """
+        docs = await self.collection.find(page_filter(conversation_id, before, before_id), MESSAGE_FIELDS).sort(
+            NEWEST_FIRST
+        ).limit(limit + 1).to_list(limit + 1)
+        return docs[:limit][::-1], len(docs) > limit
+
+    async def delete_batch(self, conversation_id: str, limit: int) -> int:
+        """Delete up to `limit` messages of a conversation"""
+        docs = await self.collection.find(
+            {"conversation_id": conversation_id}, {"_id": 1}
+        ).limit(limit).to_list(limit)
+        if not docs:
+            return 0
+        result = await for_write(self.collection, "message.purge").delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        return result.deleted_count
+
+
+class BucketMessageStore:
+    """Messages packed into `message_buckets`, at most BUCKET_SIZE per bucket"""
+
+    def __init__(self, db, bucket_size: int = BUCKET_SIZE):
+        self.collection = db.message_buckets
+        self.bucket_size = bucket_size
+
+    async def append(self, message: dict):
+        """
+        Push onto the conversation's open bucket, or close a full one and
+        start the next. The unique partial index on open buckets makes
+        concurrent appends agree on a single bucket, so buckets never
+        interleave.
+        """
+        entry = {k: v for k, v in message.items() if k != "conversation_id"}
+        conversation_id = message["conversation_id"]
+        collection = for_write(self.collection, "message.append")
+        while True:
+            result = await collection.update_one(
+                open_bucket_filter(conversation_id, self.bucket_size),
+                {
+                    "$push": {"messages": entry},
+                    "$inc": {"count": 1},
+                    "$min": {"first_at": entry["created_at"]},
+                    "$max": {"last_at": entry["created_at"]},
+                }
+            )
+            if result.matched_count:
+                return
+            await collection.update_one(
+                {"conversation_id": conversation_id, "open": True, "count": {"$gte": self.bucket_size}},
+                {"$set": {"open": False}}
+            )
+            try:
+                await collection.insert_one({
+                    "conversation_id": conversation_id,
+                    "open": True,
+                    "count": 1,
+                    "first_at": entry["created_at"],
+                    "last_at": entry["created_at"],
+                    "messages": [entry],
+                })
+                return
+            except DuplicateKeyError:
+                # Another append opened the bucket first; push onto it
+                continue
+
+    async def iter_messages(self, conversation_id: str) -> AsyncIterator[dict]:
+        buckets = self.collection.find(
+            {"conversation_id": conversation_id}, {"_id": 0, "messages": 1}
+        ).sort("first_at", 1)
+        async for bucket in buckets:
+            for msg in bucket["messages"]:
+                yield {
+                    "id": msg["id"],
+                    "conversation_id": conversation_id,
+                    "role": msg["role"],
+                    "content": msg["content"],
+                    "created_at": msg["created_at"],
+                }
+
+    async def history(
+        self, conversation_id: str, since: Optional[datetime] = None, limit: int = HISTORY_LOAD_MAX
+    ) -> List[dict]:
+        """The newest `limit` messages after `since`, oldest first"""
+        buckets = self.collection.find(
+            bucket_history_filter(conversation_id, since),
+            {"_id": 0, "messages.role": 1, "messages.content": 1, "messages.created_at": 1}
+        ).sort(BUCKETS_NEWEST_FIRST)
+        messages: List[dict] = []
+        async for bucket in buckets:
+            messages.extend(
+                msg for msg in reversed(bucket["messages"])
+                if since is None or msg["created_at"] > since
+            )
+            if len(messages) >= limit:
+                await buckets.close()
+                break
+        return messages[:limit][::-1]
+
+    async def page(
+        self, conversation_id: str, before: Optional[datetime], limit: int, before_id: Optional[str] = None
+    ) -> Tuple[List[dict], bool]:
+        """
+        Same contract as DocumentMessageStore.page. Buckets are read newest
+        first, and only until no unread bucket can hold a message that
+        sorts after the oldest one kept.
+        """
+        query = bucket_page_filter(conversation_id, before, before_id)
+        # An empty id sorts before every real id, so it means "strictly before"
+        cursor = (before, before_id or "") if before else None
+        buckets = self.collection.find(query, {"_id": 0, "last_at": 1, "messages": 1}).sort(BUCKETS_NEWEST_FIRST)
+        page: List[dict] = []
+        async for bucket in buckets:
+            if len(page) > limit and bucket["last_at"] < page[-1]["created_at"]:
+                await buckets.close()
+                break
+            for msg in bucket["messages"]:
+                if cursor is not None and (msg["created_at"], msg["id"]) >= cursor:
+                    continue
+                page.append({
+                    "id": msg["id"],
+                    "conversation_id": conversation_id,
+                    "role": msg["role"],
+                    "content": msg["content"],
+                    "created_at": msg["created_at"],
+                })
+            page.sort(key=lambda m: (m["created_at"], m["id"]), reverse=True)
+            del page[limit + 1:]
+        return page[:limit][::-1], len(page) > limit
+
+    async def delete_batch(self, conversation_id: str, limit: int) -> int:
+        """Delete up to `limit` buckets of a conversation"""
+        docs = await self.collection.find(
+            {"conversation_id": conversation_id}, {"_id": 1}
+        ).limit(limit).to_list(limit)
+        if not docs:
+            return 0
+        result = await for_write(self.collection, "message.purge").delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        return result.deleted_count
+
+
+def get_message_store(db):
+    """Build the store selected by MESSAGE_STORAGE"""
+    if MESSAGE_STORAGE == 'buckets':
+        logger.info(f"Using bucketed message storage ({BUCKET_SIZE} messages per bucket)")
+        return BucketMessageStore(db)
+    return DocumentMessageStore(db)
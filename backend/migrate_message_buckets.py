@@ -0,0 +1,140 @@
+"""
+Backfill per-message documents into bucketed message storage.
+
+Streams `messages` in (conversation_id, created_at, id) order with a cursor
+and writes full buckets in ordered batches, so memory stays bounded
+regardless of data size and a crash leaves each conversation migrated up
+to some message. A re-run resumes every conversation after the last
+message already in its buckets. `--delete-source` only deletes messages up
+to that point, so messages the app writes during the backfill survive.
+Set MESSAGE_STORAGE=buckets once it has finished.
+"""
+import argparse
+import asyncio
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+from message_store import BUCKET_SIZE
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+WRITE_BATCH = 50  # buckets per insert_many
+
+
+def make_bucket(conversation_id: str, messages: list, bucket_size: int) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        # Only a conversation's last, partly filled bucket stays open for appends
+        "open": len(messages) < bucket_size,
+        "count": len(messages),
+        "first_at": messages[0]["created_at"],
+        "last_at": messages[-1]["created_at"],
+        "messages": messages,
+    }
+
+
+def message_key(message: dict) -> tuple:
+    return (message["created_at"], message["id"])
+
+
+async def resume_point(buckets, conversation_id: str):
+    """
+    (created_at, id) of the newest message already bucketed for the
+    conversation, or None when it has no buckets yet
+    """
+    last = None
+    async for bucket in buckets.find({"conversation_id": conversation_id}, {"_id": 0, "messages": {"$slice": -1}}):
+        if bucket["messages"]:
+            key = message_key(bucket["messages"][0])
+            last = key if last is None or key > last else last
+    return last
+
+
+async def backfill(bucket_size: int, delete_source: bool):
+    # Connect to MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Backfilling messages into buckets of {bucket_size}...")
+
+    cursor = db.messages.find(
+        {}, {"_id": 0, "id": 1, "conversation_id": 1, "role": 1, "content": 1, "created_at": 1}
+    ).sort([("conversation_id", 1), ("created_at", 1), ("id", 1)]).batch_size(1000)
+
+    pending = []
+    current_id = None
+    current = []
+    resume = None
+    reopened = False
+    # Newest bucketed message per conversation; --delete-source stops there
+    migrated = {}
+    message_total = 0
+    bucket_total = 0
+
+    async def flush_pending():
+        nonlocal bucket_total
+        if pending:
+            # Ordered, so a failure leaves every conversation migrated up to a prefix
+            await db.message_buckets.insert_many(pending, ordered=True)
+            bucket_total += len(pending)
+            pending.clear()
+
+    async for msg in cursor:
+        conversation_id = msg.pop("conversation_id")
+        if conversation_id != current_id:
+            if current:
+                pending.append(make_bucket(current_id, current, bucket_size))
+            current_id, current = conversation_id, []
+            resume = await resume_point(db.message_buckets, conversation_id)
+            reopened = False
+            if resume is not None:
+                migrated[conversation_id] = resume
+        if resume is not None and message_key(msg) <= resume:
+            continue
+
+        if resume is not None and not reopened:
+            # A partly filled bucket from an earlier run is followed by new
+            # buckets now; only the last bucket may stay open
+            await db.message_buckets.update_many(
+                {"conversation_id": conversation_id, "open": True}, {"$set": {"open": False}}
+            )
+            reopened = True
+
+        current.append(msg)
+        migrated[conversation_id] = message_key(msg)
+        message_total += 1
+        if len(current) == bucket_size:
+            pending.append(make_bucket(current_id, current, bucket_size))
+            current = []
+        if len(pending) >= WRITE_BATCH:
+            await flush_pending()
+            print(f"  {message_total} messages -> {bucket_total} buckets")
+
+    if current:
+        pending.append(make_bucket(current_id, current, bucket_size))
+    await flush_pending()
+
+    print(f"✓ Migrated {message_total} messages into {bucket_total} buckets ({len(migrated)} conversations bucketed)")
+
+    if delete_source and migrated:
+        deleted = 0
+        for conversation_id, (created_at, message_id) in migrated.items():
+            result = await db.messages.delete_many({"conversation_id": conversation_id, "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lte": message_id}},
+            ]})
+            deleted += result.deleted_count
+        print(f"✓ Deleted {deleted} migrated per-message documents")
+
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bucket-size", type=int, default=BUCKET_SIZE)
+    parser.add_argument("--delete-source", action="store_true", help="remove migrated documents from messages")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.bucket_size, args.delete_source))
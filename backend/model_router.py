@@ -0,0 +1,213 @@
+"""
+Latency-, error- and cost-aware routing of LLM calls to provider/model pairs
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import contextlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from llm_cassette import cassette
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Task types
+QUESTION_GEN = "question_gen"
+EVALUATION = "evaluation"
+MOCK_FEEDBACK = "mock_feedback"
+CHAT = "chat"
+
+# Light tasks are routed to whichever healthy candidate is currently fastest
+# (cheapest first on ties); heavy tasks keep the policy order and only fail over.
+LIGHT_TASKS = {MOCK_FEEDBACK, CHAT}
+
+# The first model of each task is the one the service used before routing
+DEFAULT_POLICY = {
+    QUESTION_GEN: ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"],
+    EVALUATION: ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"],
+    MOCK_FEEDBACK: ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"],
+    CHAT: ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"],
+}
+
+# USD per million (input, output) tokens; LLM_MODEL_PRICES overrides entries
+DEFAULT_PRICES = {
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4o": (2.50, 10.00),
+    "gemini/gemini-2.0-flash": (0.10, 0.40),
+}
+
+# Separate concurrency lanes so heavy calls never queue behind light ones;
+# 0 leaves a lane uncapped
+LANE_LIMITS = {
+    "light": int(os.environ.get('LLM_LIGHT_CONCURRENCY', '16')),
+    "heavy": int(os.environ.get('LLM_HEAVY_CONCURRENCY', '0')),
+}
+
+EWMA_ALPHA = 0.2
+DEGRADED_ERROR_RATE = float(os.environ.get('LLM_DEGRADED_ERROR_RATE', '0.5'))
+FAILURE_THRESHOLD = int(os.environ.get('LLM_FAILURE_THRESHOLD', '3'))
+COOLDOWN_SECONDS = float(os.environ.get('LLM_COOLDOWN_SECONDS', '30'))
+
+
+@dataclass
+class ModelStats:
+    latency_ms: Optional[float] = None
+    error_rate: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    cost_usd: float = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.open_until
+
+    def record(self, elapsed_ms: float, ok: bool):
+        self.calls += 1
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if ok:
+            self.consecutive_failures = 0
+            if self.latency_ms is None:
+                self.latency_ms = elapsed_ms
+            else:
+                self.latency_ms = (1 - EWMA_ALPHA) * self.latency_ms + EWMA_ALPHA * elapsed_ms
+        else:
+            self.errors += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURE_THRESHOLD:
+                # Circuit opens; the model is skipped until the cooldown passes
+                self.open_until = time.monotonic() + COOLDOWN_SECONDS
+                logger.warning(f"Model circuit opened for {COOLDOWN_SECONDS}s after {self.consecutive_failures} failures")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _load_prices() -> Dict[str, tuple]:
+    prices = dict(DEFAULT_PRICES)
+    raw = os.environ.get('LLM_MODEL_PRICES')
+    if raw:
+        try:
+            prices.update({model: tuple(price) for model, price in json.loads(raw).items()})
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            logger.warning("Invalid LLM_MODEL_PRICES, using default model prices")
+    return prices
+
+
+def _load_policy() -> Dict[str, List[str]]:
+    policy = dict(DEFAULT_POLICY)
+    raw = os.environ.get('LLM_ROUTING_POLICY')
+    if raw:
+        try:
+            policy.update(json.loads(raw))
+        except json.JSONDecodeError:
+            logger.warning("Invalid LLM_ROUTING_POLICY, using default routing policy")
+    return policy
+
+
+class ModelRouter:
+    def __init__(self):
+        self.api_key = os.environ.get('EMERGENT_LLM_KEY')
+        if not self.api_key and not cassette.offline:
+            raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
+        self.policy = _load_policy()
+        self.prices = _load_prices()
+        self.stats: Dict[str, ModelStats] = {}
+        self._lanes: Dict[str, asyncio.Semaphore] = {}
+        logger.info(f"Model router initialized with policy for {sorted(self.policy)}")
+
+    def _lane(self, task: str):
+        name = "light" if task in LIGHT_TASKS else "heavy"
+        if LANE_LIMITS[name] <= 0:
+            return contextlib.nullcontext()
+        if name not in self._lanes:
+            self._lanes[name] = asyncio.Semaphore(LANE_LIMITS[name])
+        return self._lanes[name]
+
+    def cost(self, model: str, prompt: str, response: str) -> float:
+        """Estimated USD cost of one call; 0 for models without a price"""
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (estimate_tokens(prompt) * input_price + estimate_tokens(response) * output_price) / 1_000_000
+
+    def candidates(self, task: str) -> List[str]:
+        """
+        Order the configured models for a task: healthy before tripped,
+        degraded (high recent error rate) last among the healthy, and for
+        light tasks, fastest observed latency first, then cheapest
+        """
+        models = self.policy.get(task) or self.policy[CHAT]
+        now = time.monotonic()
+        healthy = [m for m in models if self.stats.setdefault(m, ModelStats()).healthy(now)]
+        tripped = [m for m in models if m not in healthy]
+        if task in LIGHT_TASKS:
+            # Unmeasured models sort first so they get probed once
+            healthy.sort(key=lambda m: (self.stats[m].latency_ms or 0.0, sum(self.prices.get(m, (0.0, 0.0)))))
+        healthy.sort(key=lambda m: self.stats[m].error_rate > DEGRADED_ERROR_RATE)
+        return healthy + tripped
+
+    async def send_message(self, task: str, session_id: str, system_message: str, text: str) -> str:
+        """
+        Send a single-turn message, failing over through the candidates
+        """
+        if cassette.enabled:
+            replayed = await cassette.replay(task, self.candidates(task), system_message, text)
+            if replayed is not None:
+                return replayed
+
+        # Imported here so replay mode runs without the LLM client installed
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        last_error = None
+        async with self._lane(task):
+            for model in self.candidates(task):
+                provider, model_name = model.split("/", 1)
+                chat = LlmChat(
+                    api_key=self.api_key,
+                    session_id=session_id,
+                    system_message=system_message
+                )
+                chat.with_model(provider, model_name)
+
+                started = time.perf_counter()
+                try:
+                    response = await chat.send_message(UserMessage(text=text))
+                except Exception as e:
+                    self.stats[model].record((time.perf_counter() - started) * 1000, ok=False)
+                    logger.warning(f"{task} call to {model} failed, trying next model: {str(e)}")
+                    last_error = e
+                    continue
+
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.stats[model].record(elapsed_ms, ok=True)
+                self.stats[model].cost_usd += self.cost(model, system_message + text, response)
+                logger.info(f"{task} routed to {model} ({elapsed_ms:.0f} ms)")
+                if cassette.recording:
+                    await cassette.record(task, model, system_message, text, response, elapsed_ms)
+                return response
+
+        raise Exception(f"All models failed for {task}: {str(last_error)}")
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current per-model stats for monitoring"""
+        now = time.monotonic()
+        return {
+            model: {
+                "latency_ms": round(s.latency_ms, 1) if s.latency_ms is not None else None,
+                "error_rate": round(s.error_rate, 3),
+                "calls": s.calls,
+                "errors": s.errors,
+                "cost_usd": round(s.cost_usd, 6),
+                "healthy": s.healthy(now),
+            }
+            for model, s in self.stats.items()
+        }
+
+# Singleton instance
+model_router = ModelRouter()
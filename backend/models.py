@@ -29,6 +29,9 @@ class ConversationSummary(BaseModel):
     title: str
     timestamp: datetime
 
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., max_length=1000)
+
 class ChatRequest(BaseModel):
     conversation_id: str
     message: str
@@ -36,3 +39,4 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     user_message: Message
     assistant_message: Message
+    prompt_tokens: Optional[int] = None
@@ -0,0 +1,168 @@
+"""
+Mongo client tuning: named connection profiles and per-operation
+write-concern tiers.
+
+MONGO_PROFILE picks a base profile; individual MONGO_* variables override
+single settings. Writes name their operation and get the write concern of
+its tier, so timestamp bumps do not pay for majority acknowledgement while
+messages and evaluations do.
+"""
+import os
+import json
+import logging
+import weakref
+from typing import Dict, Optional, Tuple
+
+from pymongo import WriteConcern
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    # Driver defaults, apart from a bounded server-selection wait
+    "default": {
+        "maxPoolSize": 100,
+        "minPoolSize": 0,
+        "serverSelectionTimeoutMS": 5000,
+    },
+    # Small, warm pool close to the API: no connection set-up on the hot path
+    "low_latency": {
+        "maxPoolSize": 50,
+        "minPoolSize": 10,
+        "maxIdleTimeMS": 300000,
+        "serverSelectionTimeoutMS": 2000,
+        "connectTimeoutMS": 2000,
+        "socketTimeoutMS": 10000,
+        "compressors": "snappy,zstd",
+    },
+    # Remote/Atlas clusters: compress the wire, tolerate slower sockets
+    "high_throughput": {
+        "maxPoolSize": 200,
+        "minPoolSize": 20,
+        "maxIdleTimeMS": 600000,
+        "serverSelectionTimeoutMS": 5000,
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 30000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 6,
+    },
+}
+
+ENV_OVERRIDES = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int),
+    "MONGO_COMPRESSORS": ("compressors", str),
+}
+
+WRITE_CONCERNS = {
+    # Acknowledged by the primary only; losing one on failover is harmless
+    "fast": WriteConcern(w=1),
+    # Survives primary failover
+    "durable": WriteConcern(w="majority", j=True),
+}
+
+DEFAULT_WRITE_TIERS = {
+    "conversation.create": "durable",
+    "conversation.touch": "fast",
+    "conversation.summary": "fast",
+    "conversation.delete": "durable",
+    "conversation.purge": "fast",
+    "message.append": "durable",
+    "message.purge": "fast",
+    "evaluation.record": "durable",
+    "rate_limit": "fast",
+    "question_demand.record": "fast",
+    "question_set.add": "fast",
+    "question_set.consume": "fast",
+    "idempotency.claim": "durable",
+    "idempotency.complete": "durable",
+}
+
+# Wire compressors are only offered when their codec is installed
+_CODECS = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def _available_compressors(names: str) -> str:
+    available = []
+    for name in (n.strip() for n in names.split(",")):
+        module = _CODECS.get(name)
+        if not module:
+            continue
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            logger.warning(f"Mongo compressor {name} requested but {module} is not installed")
+    return ",".join(available)
+
+
+def client_options(profile: Optional[str] = None) -> dict:
+    """
+    Keyword arguments for AsyncIOMotorClient for the selected profile
+    """
+    profile = profile or os.environ.get('MONGO_PROFILE', 'default')
+    if profile not in PROFILES:
+        logger.warning(f"Unknown MONGO_PROFILE {profile}, using default")
+        profile = "default"
+    options = dict(PROFILES[profile])
+    for env, (key, cast) in ENV_OVERRIDES.items():
+        if os.environ.get(env):
+            options[key] = cast(os.environ[env])
+    if options.get("compressors"):
+        options["compressors"] = _available_compressors(options["compressors"])
+        if not options["compressors"]:
+            del options["compressors"]
+            options.pop("zlibCompressionLevel", None)
+    return options
+
+
+def _load_write_tiers(raw: Optional[str] = None) -> Dict[str, str]:
+    """
+    Default tiers with MONGO_WRITE_TIERS applied; an unknown tier is a
+    configuration error and fails at startup rather than on the first write
+    """
+    tiers = dict(DEFAULT_WRITE_TIERS)
+    raw = os.environ.get('MONGO_WRITE_TIERS') if raw is None else raw
+    if raw:
+        try:
+            overrides = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning("Invalid MONGO_WRITE_TIERS, using default write tiers")
+            return tiers
+        if not isinstance(overrides, dict):
+            raise ValueError("MONGO_WRITE_TIERS must be a JSON object of operation -> tier")
+        for operation, tier in overrides.items():
+            if tier not in WRITE_CONCERNS:
+                raise ValueError(
+                    f"Unknown write tier {tier!r} for {operation} in MONGO_WRITE_TIERS, "
+                    f"expected one of {sorted(WRITE_CONCERNS)}"
+                )
+            if operation not in DEFAULT_WRITE_TIERS:
+                logger.warning(f"MONGO_WRITE_TIERS sets unknown operation {operation}")
+        tiers.update(overrides)
+    return tiers
+
+
+WRITE_TIERS = _load_write_tiers()
+# Keyed on the identity of the collection object (not its names, which
+# two clients can share); entries go away with the collection
+_tiered: Dict[int, Tuple[weakref.ref, Dict[str, object]]] = {}
+
+
+def for_write(collection, operation: str):
+    """
+    The collection with the write concern of `operation`'s tier
+    """
+    tier = WRITE_TIERS.get(operation, "durable")
+    key = id(collection)
+    entry = _tiered.get(key)
+    if entry is None or entry[0]() is not collection:
+        entry = (weakref.ref(collection, lambda _, key=key: _tiered.pop(key, None)), {})
+        _tiered[key] = entry
+    by_tier = entry[1]
+    if tier not in by_tier:
+        by_tier[tier] = collection.with_options(write_concern=WRITE_CONCERNS[tier])
+    return by_tier[tier]
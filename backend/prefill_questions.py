@@ -0,0 +1,37 @@
+"""
+Prefill question sets for the most requested roles (run from cron).
+
+This is the only place sets are generated (see question_warmup.prefill);
+server instances just load them and pick new ones up on their next cache
+reload.
+
+    python prefill_questions.py [--max-calls 60]
+"""
+import asyncio
+import argparse
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from interview_service import interview_service  # noqa: E402 - needs .env loaded
+from mongo_config import client_options  # noqa: E402
+from question_cache import QuestionSetStore  # noqa: E402
+from question_warmup import QUESTION_WARMUP_MAX_CALLS, prefill  # noqa: E402
+
+async def prefill_questions(max_calls: int):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], **client_options())
+    db = client[os.environ['DB_NAME']]
+
+    stored = await prefill(QuestionSetStore(db), interview_service, max_calls=max_calls)
+    print(f"Stored {stored} question sets")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-calls", type=int, default=QUESTION_WARMUP_MAX_CALLS)
+    args = parser.parse_args()
+    asyncio.run(prefill_questions(args.max_calls))
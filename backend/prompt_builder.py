@@ -0,0 +1,217 @@
+"""
+Prompt assembly with pre-compiled templates, local token counting and
+token-budgeted conversation history (sliding window + rolling summary)
+"""
+import os
+import logging
+from dataclasses import dataclass, field
+from string import Template
+from textwrap import dedent
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Budgets are in tokens of the target model's encoding
+HISTORY_TOKEN_BUDGET = int(os.environ.get('PROMPT_HISTORY_TOKEN_BUDGET', '2000'))
+SUMMARY_TOKEN_BUDGET = int(os.environ.get('PROMPT_SUMMARY_TOKEN_BUDGET', '400'))
+HISTORY_WINDOW = int(os.environ.get('PROMPT_HISTORY_WINDOW', '20'))
+SUMMARY_LINE_CHARS = 200
+
+ROLE_LABELS = {"user": "Me", "assistant": "AI"}
+
+
+def _compile(text: str) -> Template:
+    """Strip source indentation once, at import time"""
+    return Template(dedent(text).strip())
+
+
+CHAT_SYSTEM = _compile("""
+    You are ManuGPT, a helpful AI assistant. Provide clear, accurate, and helpful responses.
+""")
+
+CHAT_SUMMARY = _compile("""
+    Summary of earlier notes in this conversation:
+    $summary
+""")
+
+CHAT_USER = _compile("""
+    Recent notes:
+    $history
+
+    Me: $message
+""")
+
+QUESTION_GEN_SYSTEM = _compile("""
+    You are an expert technical interviewer. Generate relevant, thoughtful interview questions.
+""")
+
+QUESTION_GEN = _compile("""
+    Generate $count interview questions for a $role position.
+    Difficulty level: $difficulty
+
+    Return ONLY a JSON array with this exact format:
+    [{"text": "question text", "difficulty": "Easy/Medium/Hard", "context": "brief context if needed"}]
+
+    Make questions relevant, practical, and varied in difficulty.
+""")
+
+EVALUATION_SYSTEM = _compile("""
+    You are an expert interview evaluator. Provide constructive, specific feedback.
+""")
+
+EVALUATION = _compile("""
+    Evaluate this interview answer for a $role position.
+
+    Question: $question
+    Answer: $answer
+
+    Provide evaluation in this JSON format:
+    {"score": 0-10, "feedback": "detailed feedback", "strengths": ["strength 1", "strength 2"], "improvements": ["improvement 1", "improvement 2"]}
+
+    Be specific, constructive, and encouraging.
+""")
+
+MOCK_SYSTEM = _compile("""
+    You are conducting a professional interview for a $role position. Be conversational, ask relevant questions, and provide feedback.
+""")
+
+MOCK_CONTINUE = _compile("""
+    Based on the candidate's previous answer: "$answer"
+
+    1. Provide brief feedback (1-2 sentences)
+    2. Ask the next relevant interview question for a $role
+
+    Format your response as:
+    FEEDBACK: [your feedback]
+    QUESTION: [next question]
+""")
+
+
+_encoding = None
+
+
+def load_encoding():
+    """
+    Load the gpt-4o tokenizer. The first load may download its BPE file, so
+    the server runs this in a thread at startup rather than in a request;
+    until it succeeds, counts are approximate.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, using approximate token counts: {str(e)}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally (approximate at ~4 chars/token without tiktoken)
+    """
+    if not text:
+        return 0
+    encoding = _encoding
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class BuiltPrompt:
+    system_message: str
+    text: str
+    prompt_tokens: int
+    summary: Optional[str] = None
+    # Messages that fell out of the window and were folded into the summary
+    evicted: List[dict] = field(default_factory=list)
+
+
+def _summary_line(message: dict) -> str:
+    label = ROLE_LABELS.get(message.get("role"), message.get("role", ""))
+    content = " ".join(message.get("content", "").split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS].rstrip() + "..."
+    return f"- {label}: {content}"
+
+
+def fold_summary(summary: Optional[str], evicted: List[dict], budget: int = SUMMARY_TOKEN_BUDGET) -> Optional[str]:
+    """
+    Append evicted messages to the rolling summary, keeping the newest
+    lines that fit within the summary budget (each line counted once, plus
+    one token for its newline)
+    """
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summary_line(msg) for msg in evicted)
+    kept = []
+    used = 0
+    for line in reversed(lines):
+        tokens = count_tokens(line) + 1
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+    kept.reverse()
+    return "\n".join(kept) or None
+
+
+def build_chat_prompt(
+    message: str,
+    history: List[dict],
+    summary: Optional[str] = None,
+    budget: int = HISTORY_TOKEN_BUDGET,
+    window: int = HISTORY_WINDOW,
+) -> BuiltPrompt:
+    """
+    Build the chat prompt for a new user message.
+
+    `history` holds the conversation's not-yet-summarized messages in
+    chronological order, excluding `message` itself. The newest messages
+    are kept while they fit in `window` and `budget`; everything older is
+    returned in `evicted` and folded into the rolling summary.
+    """
+    kept = []
+    used = 0
+    for msg in reversed(history[-window:] if window else []):
+        line = f"{ROLE_LABELS.get(msg['role'], msg['role'])}: {msg['content']}"
+        tokens = count_tokens(line) + 1
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+    kept.reverse()
+
+    evicted = history[:len(history) - len(kept)]
+    if evicted:
+        summary = fold_summary(summary, evicted)
+
+    system_message = CHAT_SYSTEM.substitute()
+    if summary:
+        system_message = f"{system_message}\n\n{CHAT_SUMMARY.substitute(summary=summary)}"
+
+    if kept:
+        text = CHAT_USER.substitute(history="\n".join(kept), message=message)
+    else:
+        text = message
+
+    return BuiltPrompt(
+        system_message=system_message,
+        text=text,
+        prompt_tokens=count_tokens(system_message) + count_tokens(text),
+        summary=summary,
+        evicted=evicted,
+    )
+
+
+def build_prompt(system: Template, template: Template, **values) -> BuiltPrompt:
+    """
+    Render a single-turn prompt from pre-compiled templates
+    """
+    system_message = system.substitute(**values)
+    text = template.substitute(**values)
+    return BuiltPrompt(
+        system_message=system_message,
+        text=text,
+        prompt_tokens=count_tokens(system_message) + count_tokens(text),
+    )
@@ -0,0 +1,181 @@
+"""
+Pre-generated question sets for the most requested roles.
+
+Every /interview/generate-questions call bumps a daily demand counter for
+its (role, difficulty). The warm-up pipeline (question_warmup.py) turns the
+top of that demand into stored question sets, and each instance loads them
+into memory before it reports ready, so popular roles are served without an
+LLM round-trip right after a deploy.
+"""
+import os
+import random
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db_indexes import SAMPLE_ID, SAMPLE_TIME, register_indexes, register_pipeline, register_query
+from mongo_config import for_write
+
+logger = logging.getLogger(__name__)
+
+QUESTION_SET_TTL_HOURS = float(os.environ.get('QUESTION_SET_TTL_HOURS', '24'))
+QUESTION_DEMAND_RETENTION_DAYS = int(os.environ.get('QUESTION_DEMAND_RETENTION_DAYS', '30'))
+
+
+def top_demand_pipeline(since: datetime, limit: int) -> List[dict]:
+    return [
+        {"$match": {"day": {"$gte": since}}},
+        {"$group": {
+            "_id": "$key",
+            "role": {"$first": "$role"},
+            "difficulty": {"$first": "$difficulty"},
+            "requests": {"$sum": "$requests"},
+        }},
+        {"$sort": {"requests": -1}},
+        {"$limit": limit},
+    ]
+
+
+def fresh_filter(since: datetime, key: Optional[str] = None) -> dict:
+    """Unconsumed sets created since `since`, optionally for one key"""
+    query = {"created_at": {"$gte": since}, "consumed_at": None}
+    if key is not None:
+        query["key"] = key
+    return query
+
+
+register_indexes("question_demand", [
+    IndexModel([("day", ASCENDING)], expireAfterSeconds=QUESTION_DEMAND_RETENTION_DAYS * 86400),
+])
+register_pipeline("question_demand.top", "question_demand", top_demand_pipeline(SAMPLE_TIME, 20))
+
+register_indexes("question_sets", [
+    IndexModel([("key", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("created_at", ASCENDING)], expireAfterSeconds=int(QUESTION_SET_TTL_HOURS * 3600)),
+])
+register_query("question_sets.fresh", "question_sets", fresh_filter(SAMPLE_TIME), projection={"key": 1, "questions": 1})
+register_query("question_sets.count_fresh", "question_sets", fresh_filter(SAMPLE_TIME, SAMPLE_ID))
+
+
+def cache_key(role: str, difficulty: str) -> str:
+    """Roles are matched case- and whitespace-insensitively, like the question bank"""
+    return f"{' '.join(role.lower().split())}|{difficulty.strip().lower() or 'mixed'}"
+
+
+class QuestionSetStore:
+    def __init__(self, db):
+        self.demand = db.question_demand
+        self.sets = db.question_sets
+
+    async def record_demand(self, role: str, difficulty: str):
+        day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        key = cache_key(role, difficulty)
+        await for_write(self.demand, "question_demand.record").update_one(
+            {"_id": f"{day.date().isoformat()}:{key}"},
+            {
+                "$inc": {"requests": 1},
+                "$setOnInsert": {"key": key, "role": role, "difficulty": difficulty, "day": day},
+            },
+            upsert=True
+        )
+
+    async def top_demand(self, limit: int, days: int) -> List[dict]:
+        """
+        The `limit` most requested (role, difficulty) pairs over the last `days`
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        return await self.demand.aggregate(top_demand_pipeline(since, limit)).to_list(limit)
+
+    async def count_fresh(self, key: str, max_age_hours: float) -> int:
+        since = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        return await self.sets.count_documents(fresh_filter(since, key))
+
+    async def add_set(self, role: str, difficulty: str, questions: List[dict]):
+        await for_write(self.sets, "question_set.add").insert_one({
+            "key": cache_key(role, difficulty),
+            "role": role,
+            "difficulty": difficulty,
+            "questions": questions,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    async def load_sets(self) -> List[dict]:
+        since = datetime.now(timezone.utc) - timedelta(hours=QUESTION_SET_TTL_HOURS)
+        return await self.sets.find(fresh_filter(since), {"key": 1, "questions": 1}).to_list(None)
+
+    async def claim(self, set_id) -> bool:
+        """
+        Mark a set consumed unless another instance already has; consumed
+        sets are not loaded again and no longer count as fresh
+        """
+        result = await for_write(self.sets, "question_set.consume").update_one(
+            {"_id": set_id, "consumed_at": None}, {"$set": {"consumed_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count == 1
+
+
+class QuestionCache:
+    """
+    In-memory pools of question sets. Each set is served once across all
+    instances: it leaves the pool when taken and is claimed in Mongo (see
+    QuestionSetStore.claim) before it is served; a set another instance
+    claimed first is dropped and the next one tried.
+    """
+
+    def __init__(self, store: Optional["QuestionSetStore"] = None):
+        self.store = store
+        self.pools: Dict[str, List[dict]] = {}
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+        self.lost_claims = 0
+
+    def load(self, sets: List[dict]):
+        pools: Dict[str, List[dict]] = defaultdict(list)
+        for question_set in sets:
+            if question_set.get("questions"):
+                pools[question_set["key"]].append(question_set)
+        self.pools = dict(pools)
+        logger.info(f"Loaded {len(sets)} question sets for {len(self.pools)} role/difficulty pairs")
+
+    async def take(self, role: str, difficulty: str, count: int) -> Optional[List[dict]]:
+        pool = self.pools.get(cache_key(role, difficulty), [])
+        i = 0
+        while i < len(pool):
+            question_set = pool[i]
+            if len(question_set["questions"]) < count:
+                i += 1
+                continue
+            # Removed before the claim so no other request here can take it
+            del pool[i]
+            if self.store is not None:
+                try:
+                    claimed = await self.store.claim(question_set["_id"])
+                except Exception as e:
+                    # Generating is slower but never serves a set twice
+                    logger.warning(f"Error claiming question set: {str(e)}")
+                    break
+                if not claimed:
+                    self.lost_claims += 1
+                    continue
+            self.hits += 1
+            # Shuffle so the set's first questions are not always asked first
+            return random.sample(question_set["questions"], len(question_set["questions"]))
+        self.misses += 1
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "keys": len(self.pools),
+            "sets": sum(len(pool) for pool in self.pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lost_claims": self.lost_claims,
+        }
+
+# Singleton instance
+question_cache = QuestionCache()
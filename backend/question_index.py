@@ -0,0 +1,232 @@
+"""
+CPU-only similarity index for interview questions.
+
+Questions are embedded as signed, hashed word + character-trigram vectors
+(L2-normalized float32 rows), so cosine similarity is a single matrix
+product. Used to drop near-duplicates within a generated set, to hide
+questions a practice session has already seen, and to top up short sets
+from previously generated questions instead of making another LLM call.
+"""
+import os
+import re
+import zlib
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIM = int(os.environ.get('QUESTION_INDEX_DIM', '256'))
+SIMILARITY_THRESHOLD = float(os.environ.get('QUESTION_SIMILARITY_THRESHOLD', '0.8'))
+BANK_MAX_PER_ROLE = int(os.environ.get('QUESTION_BANK_MAX_PER_ROLE', '20000'))
+MAX_ROLES = int(os.environ.get('QUESTION_BANK_MAX_ROLES', '200'))
+MAX_SESSIONS = int(os.environ.get('QUESTION_SESSIONS_MAX', '1000'))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str) -> List[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    features = list(words)
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+def embed(texts: List[str], dim: int = DIM) -> np.ndarray:
+    """
+    Embed texts as rows of a (len(texts), dim) float32 matrix with unit norm
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # Low bits pick the column, one high bit picks the sign
+            matrix[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class QuestionIndex:
+    """
+    Fixed-capacity ring of question vectors; once full, the oldest entries
+    are overwritten
+    """
+
+    def __init__(self, capacity: int = BANK_MAX_PER_ROLE, dim: int = DIM):
+        self.capacity = capacity
+        self.dim = dim
+        self.vectors = np.zeros((min(capacity, 64), dim), dtype=np.float32)
+        self.items: List[dict] = []
+        self.size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, vectors: np.ndarray, items: List[dict]):
+        for vector, item in zip(vectors, items):
+            if self.size < self.capacity and self.size == len(self.vectors):
+                grown = np.zeros((min(self.capacity, len(self.vectors) * 2), self.dim), dtype=np.float32)
+                grown[:self.size] = self.vectors[:self.size]
+                self.vectors = grown
+            self.vectors[self._next] = vector
+            if self._next < len(self.items):
+                self.items[self._next] = item
+            else:
+                self.items.append(item)
+            self._next = (self._next + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def max_similarity(self, vectors: np.ndarray) -> np.ndarray:
+        """Highest cosine similarity of each query row against the index"""
+        if self.size == 0 or len(vectors) == 0:
+            return np.zeros(len(vectors), dtype=np.float32)
+        return (self.vectors[:self.size] @ vectors.T).max(axis=0)
+
+
+def dedupe(vectors: np.ndarray, threshold: float = SIMILARITY_THRESHOLD) -> List[int]:
+    """
+    Greedily keep rows that are not near-duplicates of an earlier kept row
+    """
+    similarity = vectors @ vectors.T
+    kept: List[int] = []
+    for i in range(len(vectors)):
+        if not kept or similarity[i, kept].max() < threshold:
+            kept.append(i)
+    return kept
+
+
+class NotEnoughQuestions(ValueError):
+    """Raised when a set cannot be filled to the requested count"""
+
+
+class QuestionBank:
+    """
+    Per-role question banks plus per-session "already seen" indexes; both
+    are LRU-capped since roles and session ids come from clients
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, max_roles: int = MAX_ROLES):
+        self.threshold = threshold
+        self.max_roles = max_roles
+        self.banks: "OrderedDict[str, QuestionIndex]" = OrderedDict()
+        self.sessions: "OrderedDict[str, QuestionIndex]" = OrderedDict()
+
+    def _bank(self, role: str) -> QuestionIndex:
+        key = " ".join(role.lower().split())
+        if key in self.banks:
+            self.banks.move_to_end(key)
+        else:
+            self.banks[key] = QuestionIndex()
+            if len(self.banks) > self.max_roles:
+                self.banks.popitem(last=False)
+        return self.banks[key]
+
+    def _session(self, session_id: Optional[str]) -> Optional[QuestionIndex]:
+        if not session_id:
+            return None
+        if session_id in self.sessions:
+            self.sessions.move_to_end(session_id)
+        else:
+            self.sessions[session_id] = QuestionIndex(capacity=1000)
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        return self.sessions[session_id]
+
+    def select(
+        self,
+        role: str,
+        questions: List[dict],
+        count: int,
+        session_id: Optional[str] = None,
+        reuse_seen: bool = True,
+        padding: Optional[List[dict]] = None,
+    ) -> List[dict]:
+        """
+        Drop near-duplicates (within the set and against what the session
+        has seen), top up from the role's bank, and record the result.
+
+        If that still leaves fewer than `count`, already-seen questions are
+        reused, least similar to the set first (unless `reuse_seen` is
+        False), and then `padding` questions are appended; raises
+        NotEnoughQuestions when the set cannot be filled.
+        """
+        bank = self._bank(role)
+        seen = self._session(session_id)
+
+        vectors = embed([q.get("text", "") for q in questions])
+        keep = dedupe(vectors, self.threshold)
+        if seen is not None:
+            fresh = seen.max_similarity(vectors[keep]) < self.threshold
+            keep = [i for i, ok in zip(keep, fresh) if ok]
+
+        # Only genuinely new questions go into the bank
+        novel = [i for i, sim in zip(keep, bank.max_similarity(vectors[keep])) if sim < self.threshold]
+        bank.add(vectors[novel], [questions[i] for i in novel])
+
+        selected = [questions[i] for i in keep][:count]
+        selected_vectors = vectors[keep][:count]
+
+        if len(selected) < count and len(bank):
+            # Candidates must differ from both the session history and this set
+            candidates = bank.vectors[:bank.size]
+            blocked = selected_vectors if seen is None else np.vstack([seen.vectors[:seen.size], selected_vectors])
+            if len(blocked):
+                open_rows = np.flatnonzero((candidates @ blocked.T).max(axis=1) < self.threshold)
+            else:
+                open_rows = np.arange(bank.size)
+            needed = count - len(selected)
+            picked: List[int] = []
+            for row in np.random.permutation(open_rows):
+                if picked and (candidates[picked] @ candidates[row]).max() >= self.threshold:
+                    continue
+                picked.append(row)
+                if len(picked) == needed:
+                    break
+            selected.extend(bank.items[row] for row in picked)
+            selected_vectors = np.vstack([selected_vectors, candidates[picked]])
+            logger.info(f"Topped up {role} questions from bank to {len(selected)}/{count}")
+
+        texts = {q.get("text", "") for q in selected}
+        if len(selected) < count and reuse_seen:
+            # Repeat seen questions rather than return a short set
+            kept = set(keep)
+            dropped = [i for i in range(len(questions)) if i not in kept]
+            pool = [questions[i] for i in dropped] + bank.items[:bank.size]
+            pool_vectors = np.vstack([vectors[dropped], bank.vectors[:bank.size]])
+            for row in np.argsort(self._max_similarity(pool_vectors, selected_vectors), kind="stable"):
+                if pool[row].get("text", "") in texts:
+                    continue
+                texts.add(pool[row].get("text", ""))
+                selected.append(pool[row])
+                selected_vectors = np.vstack([selected_vectors, pool_vectors[row:row + 1]])
+                if len(selected) == count:
+                    break
+            logger.info(f"Reused seen {role} questions to fill {len(selected)}/{count}")
+
+        if len(selected) < count and padding:
+            extra = [q for q in padding if q.get("text", "") not in texts][:count - len(selected)]
+            selected.extend(extra)
+            selected_vectors = np.vstack([selected_vectors, embed([q.get("text", "") for q in extra])])
+            logger.info(f"Padded {role} questions with {len(extra)} fallbacks to {len(selected)}/{count}")
+
+        if len(selected) < count:
+            raise NotEnoughQuestions(f"Only {len(selected)} of {count} {role} questions available")
+
+        if seen is not None:
+            seen.add(selected_vectors, selected)
+        return selected
+
+    @staticmethod
+    def _max_similarity(vectors: np.ndarray, against: np.ndarray) -> np.ndarray:
+        if len(against) == 0:
+            return np.zeros(len(vectors), dtype=np.float32)
+        return (vectors @ against.T).max(axis=1)
+
+# Singleton instance
+question_bank = QuestionBank()
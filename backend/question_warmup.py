@@ -0,0 +1,123 @@
+"""
+Question cache warm-up and prefill.
+
+`prefill` reads recent question demand, picks the top roles/difficulties
+and generates missing question sets through the interview service, spaced
+to stay within a call budget. It runs from the prefill_questions.py cron
+job only, so the budget is spent once per run rather than once per worker.
+
+Server instances only load stored sets: at startup (then the cache is
+marked ready) and periodically afterwards. Sets are marked consumed when
+they are served (see QuestionCache.take), so reloads skip them and
+prefill replaces them.
+"""
+import os
+import asyncio
+import logging
+from typing import Optional
+
+from question_cache import QUESTION_SET_TTL_HOURS, cache_key
+
+logger = logging.getLogger(__name__)
+
+QUESTION_WARMUP_TOP_N = int(os.environ.get('QUESTION_WARMUP_TOP_N', '20'))
+QUESTION_WARMUP_LOOKBACK_DAYS = int(os.environ.get('QUESTION_WARMUP_LOOKBACK_DAYS', '7'))
+QUESTION_WARMUP_SETS_PER_KEY = int(os.environ.get('QUESTION_WARMUP_SETS_PER_KEY', '3'))
+QUESTION_WARMUP_SET_SIZE = int(os.environ.get('QUESTION_WARMUP_SET_SIZE', '10'))
+# Sets younger than this count as fresh; older ones are replaced before they expire
+QUESTION_WARMUP_REFRESH_HOURS = float(os.environ.get('QUESTION_WARMUP_REFRESH_HOURS', str(QUESTION_SET_TTL_HOURS / 2)))
+# Rate budget for model calls made by one prefill pass
+QUESTION_WARMUP_CALLS_PER_MINUTE = float(os.environ.get('QUESTION_WARMUP_CALLS_PER_MINUTE', '20'))
+QUESTION_WARMUP_MAX_CALLS = int(os.environ.get('QUESTION_WARMUP_MAX_CALLS', '60'))
+QUESTION_CACHE_RELOAD_SECONDS = float(os.environ.get('QUESTION_CACHE_RELOAD_SECONDS', '600'))
+
+
+async def prefill(store, service, max_calls: int = QUESTION_WARMUP_MAX_CALLS) -> int:
+    """
+    Generate missing question sets for the top demand; returns sets stored.
+
+    Keys are filled one set per round, most requested first, so a budget
+    that runs out still leaves every top key with at least one set.
+    """
+    targets = await store.top_demand(QUESTION_WARMUP_TOP_N, QUESTION_WARMUP_LOOKBACK_DAYS)
+    if not targets:
+        logger.info("No recent question demand; nothing to prefill")
+        return 0
+
+    missing = {}
+    for target in targets:
+        fresh = await store.count_fresh(cache_key(target["role"], target["difficulty"]), QUESTION_WARMUP_REFRESH_HOURS)
+        if fresh < QUESTION_WARMUP_SETS_PER_KEY:
+            missing[target["_id"]] = QUESTION_WARMUP_SETS_PER_KEY - fresh
+
+    interval = 60 / QUESTION_WARMUP_CALLS_PER_MINUTE if QUESTION_WARMUP_CALLS_PER_MINUTE > 0 else 0
+    calls = stored = 0
+    while missing and calls < max_calls:
+        for target in targets:
+            if target["_id"] not in missing or calls >= max_calls:
+                continue
+            if calls:
+                await asyncio.sleep(interval)
+            calls += 1
+            try:
+                questions = await service.generate_question_set(
+                    target["role"], QUESTION_WARMUP_SET_SIZE, target["difficulty"]
+                )
+                if not isinstance(questions, list) or not questions:
+                    raise ValueError("model returned no question list")
+            except Exception as e:
+                # Do not spend more budget on a key the model keeps failing
+                logger.warning(f"Prefill for {target['_id']} failed: {str(e)}")
+                missing.pop(target["_id"])
+                continue
+            await store.add_set(target["role"], target["difficulty"], questions)
+            stored += 1
+            missing[target["_id"]] -= 1
+            if not missing[target["_id"]]:
+                missing.pop(target["_id"])
+
+    logger.info(f"Prefilled {stored} question sets for {len(targets)} top roles ({calls} model calls)")
+    return stored
+
+
+class QuestionWarmer:
+    def __init__(self, store, cache):
+        self.store = store
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Question cache warm-up started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def warm_up(self):
+        """Load stored sets, then mark ready"""
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"Question cache warm-up failed: {str(e)}")
+        finally:
+            # A cold cache only costs latency; never keep the instance out of rotation
+            self.cache.ready = True
+
+    async def reload(self):
+        self.cache.load(await self.store.load_sets())
+
+    async def _run(self):
+        await self.warm_up()
+        while True:
+            await asyncio.sleep(QUESTION_CACHE_RELOAD_SECONDS)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Question cache reload failed: {str(e)}")
@@ -0,0 +1,195 @@
+"""
+On-demand per-request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILE_ADMIN_TOKEN>` or
+is picked by PROFILE_SAMPLE_RATE. Traces (cProfile stats plus wall and
+thread CPU/idle timing) are kept in a bounded ring buffer and can be downloaded as pstats
+or speedscope JSON. When neither trigger is configured the middleware is
+not installed at all, so the hook costs nothing.
+
+cProfile and the CPU clock cover the whole event-loop thread: coroutines
+of other requests that run while a profiled request is awaiting are
+included in its trace and in `thread_cpu_ms`, and `thread_idle_ms` is the
+time the thread had nothing to run. Only one request is profiled at a time.
+"""
+import os
+import hmac
+import time
+import uuid
+import random
+import cProfile
+import marshal
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ADMIN_TOKEN = os.environ.get('PROFILE_ADMIN_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_BUFFER_SIZE = int(os.environ.get('PROFILE_BUFFER_SIZE', '50'))
+SPEEDSCOPE_MAX_DEPTH = 64
+SPEEDSCOPE_MAX_SAMPLES = 50_000
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+class RequestProfiler:
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self.traces = deque(maxlen=size)
+        self.active = False
+
+    def add(self, trace: dict):
+        self.traces.append(trace)
+
+    def list(self) -> List[dict]:
+        return [{k: v for k, v in trace.items() if k != "stats"} for trace in reversed(self.traces)]
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        for trace in self.traces:
+            if trace["id"] == trace_id:
+                return trace
+        return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests end to end"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    def _selected(self, scope) -> bool:
+        for name, value in scope.get("headers") or []:
+            if name == b"x-profile":
+                return is_admin(value.decode("latin-1"))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.profiler.active or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        self.profiler.active = True
+        profile = cProfile.Profile()
+        started_at = datetime.now(timezone.utc)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            self.profiler.active = False
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            # Thread-wide, not per request: other requests' coroutines count too
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+            profile.create_stats()
+            self.profiler.add({
+                "id": str(uuid.uuid4()),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status.get("code"),
+                "started_at": started_at.isoformat(),
+                "wall_ms": round(wall_ms, 2),
+                "thread_cpu_ms": round(cpu_ms, 2),
+                # Time the event-loop thread sat idle waiting on I/O
+                "thread_idle_ms": round(max(0.0, wall_ms - cpu_ms), 2),
+                "stats": profile.stats,
+            })
+            logger.info(f"Profiled {scope['method']} {scope['path']} ({wall_ms:.1f} ms wall, {cpu_ms:.1f} ms thread cpu)")
+
+
+def to_pstats(trace: dict) -> bytes:
+    """Bytes in the format written by pstats.Stats.dump_stats"""
+    return marshal.dumps(trace["stats"])
+
+
+def to_speedscope(trace: dict) -> dict:
+    """
+    Convert aggregated cProfile stats to a speedscope "sampled" profile.
+
+    Call stacks are reconstructed from caller/callee edges, splitting each
+    function's time across its callers in proportion to their share.
+    Callers that were already running when profiling started (the event
+    loop, the middleware itself) leave no caller edge; the share of a
+    function's time not covered by its recorded callers starts a stack at
+    that function, so the sample weights add up to the pstats total.
+    """
+    stats = trace["stats"]
+    frames: List[dict] = []
+    frame_index: Dict[tuple, int] = {}
+    callees: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, caller_ct) in callers.items():
+            callees.setdefault(caller, {})[func] = caller_ct
+
+    def frame(func) -> int:
+        if func not in frame_index:
+            filename, line, name = func
+            frame_index[func] = len(frames)
+            frames.append({"name": name, "file": filename, "line": line})
+        return frame_index[func]
+
+    samples: List[List[int]] = []
+    weights: List[float] = []
+
+    def walk(func, stack: List[int], path: set, scale: float):
+        tottime = stats[func][2]
+        stack = stack + [frame(func)]
+        if tottime * scale > 0:
+            samples.append(stack)
+            weights.append(tottime * scale)
+        if len(stack) >= SPEEDSCOPE_MAX_DEPTH or len(samples) >= SPEEDSCOPE_MAX_SAMPLES:
+            return
+        for callee, edge_ct in callees.get(func, {}).items():
+            callee_ct = stats[callee][3]
+            if callee in path or callee_ct <= 0:
+                continue
+            walk(callee, stack, path | {callee}, scale * min(1.0, edge_ct / callee_ct))
+
+    for func, (_, _, _, ct, callers) in stats.items():
+        if not callers:
+            walk(func, [], {func}, 1.0)
+            continue
+        # Time not covered by a profiled caller's edge belongs to a caller
+        # that was entered before profiling started
+        known_ct = sum(caller_ct for caller, (_, _, _, caller_ct) in callers.items() if caller in stats and caller != func)
+        missing_ct = ct - known_ct
+        if ct > 0 and missing_ct > ct * 1e-6:
+            walk(func, [], {func}, missing_ct / ct)
+
+    total = sum(weights)
+    name = f"{trace['method']} {trace['path']} @ {trace['started_at']}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": total,
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "request_profiler",
+    }
+
+# Singleton instance
+request_profiler = RequestProfiler()
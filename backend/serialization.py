@@ -0,0 +1,133 @@
+"""
+Fast-path JSON serialization for documents we wrote ourselves.
+
+Read endpoints for trusted data skip pydantic re-validation and encode Mongo
+documents straight to JSON, streaming and compressing the body as it goes.
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MESSAGE_FIELDS = {"_id": 0, "id": 1, "conversation_id": 1, "role": 1, "content": 1, "created_at": 1}
+COMPRESS_MIN_SIZE = 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """
+    Encode to compact UTF-8 JSON, using orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class _Compressor:
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=4)
+        elif encoding == "gzip":
+            self._obj = zlib.compressobj(6, zlib.DEFLATED, 31)
+        else:
+            self._obj = None
+
+    def compress(self, data: bytes) -> bytes:
+        if self._obj is None:
+            return data
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self._obj is None:
+            return b""
+        return self._obj.finish() if self.encoding == "br" else self._obj.flush()
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Pick br or gzip from Accept-Encoding, preferring br"""
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in request.headers.get("accept-encoding", "").split(",")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def json_response(request: Request, content, status_code: int = 200) -> Response:
+    """
+    Encode a trusted value in one shot, compressing bodies above COMPRESS_MIN_SIZE
+    """
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request) if len(body) >= COMPRESS_MIN_SIZE else None
+    if encoding:
+        compressor = _Compressor(encoding)
+        body = compressor.compress(body) + compressor.flush()
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+async def _iter_document(head: dict, key: str, items: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    # `head` is encoded without its closing brace so the streamed array can be appended
+    prefix = dumps(head)[:-1]
+    yield prefix + (b',"' if head else b'"') + key.encode("utf-8") + b'":['
+    first = True
+    async for item in items:
+        chunk = dumps(item)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]}"
+
+
+async def _buffered(parts: AsyncIterable[bytes], compressor: _Compressor) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for part in parts:
+        buffer += compressor.compress(part)
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+def streaming_document_response(request: Request, head: dict, key: str, items: AsyncIterable[dict]) -> StreamingResponse:
+    """
+    Stream `head` with `items` as a JSON array under `key`, e.g. a conversation
+    and its messages straight from a Mongo cursor
+    """
+    encoding = negotiate_encoding(request)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        _buffered(_iter_document(head, key, items), _Compressor(encoding)),
+        media_type="application/json",
+        headers=headers,
+    )
+
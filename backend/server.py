@@ -1,22 +1,57 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Header, Response, Query
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import BaseModel, Field
 import os
+import asyncio
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import List
-from datetime import datetime, timezone
+from typing import List, Optional
 
-from interview_service import interview_service
+from models import (
+    Message, Conversation, ConversationCreate, ConversationSummary,
+    BulkDeleteRequest, ChatRequest, ChatResponse,
+)
+from ai_service import ai_service
+from interview_service import interview_service, MAX_QUESTION_COUNT
+from model_router import model_router
+from serialization import json_response, streaming_document_response
+from conversation_store import ConversationStore, CHAT_FIELDS
+from message_store import get_message_store, MESSAGE_PAGE_MAX
+from db_indexes import apply_indexes
+from conversation_reaper import ConversationReaper
+from request_profiler import (
+    ProfilingMiddleware, request_profiler, profiling_enabled, is_admin, to_pstats, to_speedscope,
+)
+from evaluation_store import EvaluationStore
+from admission import AdmissionController, AdmissionMiddleware, get_rate_limit_backend
+from mongo_config import client_options
+from question_cache import QuestionSetStore, question_cache
+from question_warmup import QuestionWarmer
+from idempotency_store import IdempotencyStore, IdempotencyConflict, IdempotencyMismatch, request_hash, IDEMPOTENCY_POLL_SECONDS
+from drain import DrainController, is_drain_admin
+from prompt_builder import load_encoding
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, **client_options())
 db = client[os.environ['DB_NAME']]
+conversation_store = ConversationStore(db)
+message_store = get_message_store(db)
+conversation_reaper = ConversationReaper(conversation_store, message_store)
+evaluation_store = EvaluationStore(db)
+admission = AdmissionController(get_rate_limit_backend(db))
+question_set_store = QuestionSetStore(db)
+question_cache.store = question_set_store
+question_warmer = QuestionWarmer(question_set_store, question_cache)
+idempotency_store = IdempotencyStore(db)
+drain_controller = DrainController(admission)
 
 # Create the main app
 app = FastAPI()
@@ -32,13 +67,15 @@ logger = logging.getLogger(__name__)
 # Request/Response Models
 class QuestionRequest(BaseModel):
     role: str
-    count: int = 5
+    count: int = Field(5, ge=1, le=MAX_QUESTION_COUNT)
     difficulty: str = 'mixed'
+    session_id: Optional[str] = None
 
 class EvaluationRequest(BaseModel):
     question: dict
     answer: str
     role: str
+    user_id: Optional[str] = None
 
 class MockStartRequest(BaseModel):
     role: str
@@ -54,162 +91,433 @@ class MockContinueRequest(BaseModel):
 async def root():
     return {"message": "AI Interview Assistant API is running"}
 
+@api_router.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the question cache has been warmed, and
+    again once the instance starts draining
+    """
+    status = {
+        **question_cache.snapshot(),
+        "draining": drain_controller.draining,
+        "in_flight": drain_controller.in_flight,
+    }
+    if not question_cache.ready or drain_controller.draining:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@api_router.get("/models/stats")
+async def get_model_stats():
+    """
+    Live latency, error and estimated cost stats used by the model router
+    """
+    return {"policy": model_router.policy, "models": model_router.snapshot()}
+
+@api_router.get("/admission/stats")
+async def get_admission_stats():
+    """
+    In-flight requests and rejection counters from admission control
+    """
+    return admission.snapshot()
+
+def _require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=404, detail="Not found")
+
+@api_router.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Captured request profiles, newest first
+    """
+    _require_admin(x_admin_token)
+    return {"profiles": request_profiler.list()}
+
+@api_router.get("/admin/profiles/{trace_id}")
+async def download_profile(trace_id: str, format: str = "pstats", x_admin_token: Optional[str] = Header(None)):
+    """
+    Download a captured profile as pstats (load with pstats.Stats) or speedscope JSON
+    """
+    _require_admin(x_admin_token)
+    trace = request_profiler.get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return to_speedscope(trace)
+    return Response(
+        to_pstats(trace),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{trace_id}.pstats"'}
+    )
+
+@api_router.post("/admin/drain")
+async def start_drain(x_admin_token: Optional[str] = Header(None)):
+    """
+    Stop admitting requests and wait for in-flight model calls.
+
+    This is the pre-stop hook: call it before sending SIGTERM. The drain in
+    the shutdown handler runs only after uvicorn has stopped accepting
+    connections, so it cannot turn new requests away with a retryable 503.
+    """
+    if not is_drain_admin(x_admin_token):
+        raise HTTPException(status_code=404, detail="Not found")
+    in_flight = drain_controller.in_flight
+    remaining = await drain_controller.drain()
+    return {"draining": True, "in_flight": in_flight, "remaining": remaining}
+
+async def _run_idempotent(scope: str, key: Optional[str], body: BaseModel, work):
+    """
+    Run model-backed `work` as a protected task that finishes even during a
+    drain. With an Idempotency-Key its result is stored, and a retry with
+    the same key and body gets the stored result instead of a second model call.
+    """
+    if not key:
+        return await drain_controller.protect(work())
+    try:
+        stored = await idempotency_store.claim(scope, key, request_hash(body.dict()))
+    except IdempotencyConflict as e:
+        # Still running elsewhere; clients poll until it completes
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": str(IDEMPOTENCY_POLL_SECONDS)})
+    except IdempotencyMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stored is not None:
+        logger.info(f"Returning stored {scope} result for idempotency key {key}")
+        return stored
+
+    async def run():
+        try:
+            result = await work()
+        except Exception:
+            await idempotency_store.release(scope, key)
+            raise
+        await idempotency_store.complete(scope, key, result)
+        return result
+
+    return await drain_controller.protect(run())
+
 @api_router.post("/interview/generate-questions")
-async def generate_questions(request: QuestionRequest):
+async def generate_questions(request: QuestionRequest, idempotency_key: Optional[str] = Header(None)):
     """
     Generate interview questions based on role
     """
+    try:
+        # Demand counters drive which roles the warm-up pipeline prefills
+        try:
+            await question_set_store.record_demand(request.role, request.difficulty)
+        except Exception as e:
+            logger.warning(f"Error recording question demand: {str(e)}")
+
+        async def work():
+            questions = await interview_service.generate_questions(
+                role=request.role,
+                count=request.count,
+                difficulty=request.difficulty,
+                session_id=request.session_id
+            )
+            return {"questions": questions}
+
+        return await _run_idempotent("generate_questions", idempotency_key, request, work)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating questions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/interview/evaluate-answer")
+async def evaluate_answer(request: EvaluationRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Evaluate an interview answer
+    """
+    try:
+        async def work():
+            evaluation = await interview_service.evaluate_answer(
+                question=request.question,
+                answer=request.answer,
+                role=request.role
+            )
+
+            # Persist real evaluations so progress stats never re-run them;
+            # an analytics failure must not cost the user their evaluation
+            if request.user_id and not evaluation.get("fallback"):
+                try:
+                    await evaluation_store.record(request.user_id, request.role, request.question, evaluation)
+                except Exception as e:
+                    logger.error(f"Error recording evaluation: {str(e)}")
+
+            return {"evaluation": evaluation}
+
+        return await _run_idempotent("evaluate_answer", idempotency_key, request, work)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error evaluating answer: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/interview/stats")
+async def get_interview_stats(user_id: str, role: Optional[str] = None):
+    """
+    Progress stats per role, read from incrementally maintained rollups
+    """
+    try:
+        return {"stats": await evaluation_store.stats(user_id, role)}
+    except Exception as e:
+        logger.error(f"Error getting interview stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/interview/start-mock")
+async def start_mock_interview(request: MockStartRequest):
+    """
+    Start a mock interview session
+    """
+    try:
+        result = await interview_service.start_mock_interview(role=request.role)
+        return result
+    except Exception as e:
+        logger.error(f"Error starting mock interview: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/interview/mock-continue")
+async def continue_mock_interview(request: MockContinueRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Continue mock interview with next question
+    """
+    try:
+        async def work():
+            return await interview_service.continue_mock_interview(
+                session_id=request.session_id,
+                answer=request.answer,
+                role=request.role,
+                question_count=request.question_count
+            )
+
+        return await _run_idempotent("mock_continue", idempotency_key, request, work)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error continuing mock interview: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/conversations", response_model=Conversation)
+async def create_conversation(conversation_input: ConversationCreate):
+    """
+    Create a new conversation
+    """
     try:
         conversation = Conversation(
             title=conversation_input.title or "New note"
         )
-        
+
         # Save to database
         conversation_dict = conversation.dict()
-        await conversations_collection.insert_one(conversation_dict)
-        
+        await conversation_store.create(conversation_dict)
+
         logger.info(f"Created conversation: {conversation.id}")
         return conversation
-        
+
     except Exception as e:
         logger.error(f"Error creating conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/conversations", response_model=List[ConversationSummary])
-async def get_conversations():
+async def get_conversations(request: Request):
     """
     Get all conversations (sorted by most recent)
     """
     try:
         # Get all conversations sorted by updated_at
-        conversations = await conversations_collection.find({}, {"_id": 0}).sort("updated_at", -1).to_list(1000)
-        
-        # Transform to summary format
+        conversations = await conversation_store.list_summaries()
+
+        # Transform to summary format; these are our own documents, so they
+        # are encoded directly instead of being re-validated
         summaries = [
-            ConversationSummary(
-                id=conv["id"],
-                title=conv.get("title", "New note"),
-                timestamp=conv["updated_at"]
-            )
+            {
+                "id": conv["id"],
+                "title": conv.get("title", "New note"),
+                "timestamp": conv["updated_at"]
+            }
             for conv in conversations
         ]
-        
-        return summaries
-        
+
+        return json_response(request, summaries)
+
     except Exception as e:
-        logger.error(f"Error generating questions: {str(e)}")
+        logger.error(f"Error getting conversations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/interview/evaluate-answer")
-async def evaluate_answer(request: EvaluationRequest):
+@api_router.get("/conversations/{conversation_id}", response_model=Conversation)
+async def get_conversation(conversation_id: str, request: Request):
     """
-    Evaluate an interview answer
+    Get a specific conversation with all messages
     """
     try:
         # Get conversation
-        conversation = await conversations_collection.find_one({"id": conversation_id}, {"_id": 0})
+        conversation = await conversation_store.get(conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        # Get messages for this conversation
-        messages = await messages_collection.find(
-            {"conversation_id": conversation_id}, {"_id": 0}
-        ).sort("created_at", 1).to_list(1000)
-        
-        # Build response
-        conversation_obj = Conversation(**conversation)
-        conversation_obj.messages = [Message(**msg) for msg in messages]
-        
-        return conversation_obj
-        
+
+        # Stream messages straight from the cursor into the response body
+        messages = message_store.iter_messages(conversation_id)
+
+        return streaming_document_response(request, conversation, "messages", messages)
+
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error evaluating answer: {str(e)}")
+        logger.error(f"Error getting conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/interview/start-mock")
-async def start_mock_interview(request: MockStartRequest):
+@api_router.get("/conversations/{conversation_id}/messages")
+async def get_conversation_messages(
+    conversation_id: str,
+    request: Request,
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MESSAGE_PAGE_MAX),
+):
     """
-    Start a mock interview session
+    Get one page of messages, oldest first; pass the `created_at` and `id`
+    of the oldest message already loaded as `before` and `before_id` to
+    fetch the page preceding it
     """
     try:
-        result = await interview_service.start_mock_interview(role=request.role)
-        return result
+        if not await conversation_store.get(conversation_id, {"_id": 0, "id": 1}):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        messages, has_more = await message_store.page(conversation_id, before, limit, before_id)
+        return json_response(request, {"messages": messages, "has_more": has_more})
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error starting mock interview: {str(e)}")
+        logger.error(f"Error getting conversation messages: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/interview/mock-continue")
-async def continue_mock_interview(request: MockContinueRequest):
+@api_router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
     """
-    Continue mock interview with next question
+    Delete a conversation; its messages are purged in the background
+    """
+    try:
+        if not await conversation_store.soft_delete([conversation_id]):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        logger.info(f"Deleted conversation: {conversation_id}")
+        return {"success": True}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting conversation: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/conversations/bulk-delete")
+async def bulk_delete_conversations(request: BulkDeleteRequest):
+    """
+    Delete many conversations in one call; messages are purged in the background
+    """
+    try:
+        deleted = await conversation_store.soft_delete(request.ids)
+        logger.info(f"Bulk deleted {deleted} conversations")
+        return {"success": True, "deleted": deleted}
+    except Exception as e:
+        logger.error(f"Error bulk deleting conversations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/chat", response_model=ChatResponse)
+async def chat(chat_request: ChatRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Send a message and get AI response
     """
     try:
         # Get conversation to check if it exists
-        conversation = await conversations_collection.find_one({"id": chat_request.conversation_id}, {"_id": 0})
+        conversation = await conversation_store.get(chat_request.conversation_id, CHAT_FIELDS)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        # Create user message
-        user_message = Message(
-            conversation_id=chat_request.conversation_id,
-            role="user",
-            content=chat_request.message
-        )
-        
-        # Save user message
-        await messages_collection.insert_one(user_message.dict())
-        
-        # Update conversation title if it's the first message
-        message_count = await messages_collection.count_documents(
-            {"conversation_id": chat_request.conversation_id}
-        )
-        
-        if message_count == 1:
-            # Use first 50 characters of first message as title
-            title = chat_request.message[:50]
-            await conversations_collection.update_one(
-                {"id": chat_request.conversation_id},
-                {"$set": {"title": title, "updated_at": datetime.now(timezone.utc)}}
-            )
-        else:
-            # Just update the timestamp
-            await conversations_collection.update_one(
-                {"id": chat_request.conversation_id},
-                {"$set": {"updated_at": datetime.now(timezone.utc)}}
-            )
-        
-        # Get AI response
-        ai_response_text = await ai_service.get_response(
-            message=chat_request.message,
-            conversation_id=chat_request.conversation_id
-        )
-        
-        # Create assistant message
-        assistant_message = Message(
-            conversation_id=chat_request.conversation_id,
-            role="assistant",
-            content=ai_response_text
-        )
-        
-        # Save assistant message
-        await messages_collection.insert_one(assistant_message.dict())
-        
-        logger.info(f"Chat completed for conversation {chat_request.conversation_id}")
-        
-        return ChatResponse(
-            user_message=user_message,
-            assistant_message=assistant_message
-        )
-        return result
+
+        return await _run_idempotent("chat", idempotency_key, chat_request, lambda: _complete_chat(chat_request, conversation))
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error continuing mock interview: {str(e)}")
+        logger.error(f"Error in chat: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _complete_chat(chat_request: ChatRequest, conversation: dict) -> dict:
+    # Only messages newer than the rolling summary are loaded; older ones
+    # are already folded into it, so this stays bounded by the window
+    history = await message_store.history(
+        chat_request.conversation_id, since=conversation.get("summary_until")
+    )
+
+    # Created now for its timestamp, but saved only with the reply: a
+    # failed call is retried with the same Idempotency-Key and must not
+    # leave a copy of the user message behind
+    user_message = Message(
+        conversation_id=chat_request.conversation_id,
+        role="user",
+        content=chat_request.message
+    )
+
+    if not history and not conversation.get("summary_until"):
+        # Use first 50 characters of first message as title
+        title = chat_request.message[:50]
+        await conversation_store.touch(chat_request.conversation_id, title=title)
+    else:
+        # Just update the timestamp
+        await conversation_store.touch(chat_request.conversation_id)
+
+    # Get AI response
+    ai_response = await ai_service.get_response(
+        message=chat_request.message,
+        conversation_id=chat_request.conversation_id,
+        history=history,
+        summary=conversation.get("summary")
+    )
+
+    # The conversation may have been deleted (and purged) during the model
+    # call; the reaper's grace period covers the gap until the append below
+    if not await conversation_store.is_live(chat_request.conversation_id):
+        logger.info(f"Conversation {chat_request.conversation_id} was deleted during chat; reply not saved")
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    # Persist the rolling summary so evicted messages are never reloaded
+    if ai_response["evicted"]:
+        await conversation_store.set_summary(
+            chat_request.conversation_id,
+            ai_response["summary"],
+            ai_response["evicted"][-1]["created_at"]
+        )
+
+    # Create assistant message
+    assistant_message = Message(
+        conversation_id=chat_request.conversation_id,
+        role="assistant",
+        content=ai_response["content"]
+    )
+
+    # Save both messages
+    await message_store.append(user_message.dict())
+    await message_store.append(assistant_message.dict())
+
+    logger.info(f"Chat completed for conversation {chat_request.conversation_id}")
+
+    return ChatResponse(
+        user_message=user_message,
+        assistant_message=assistant_message,
+        prompt_tokens=ai_response["prompt_tokens"]
+    ).dict()
+
 # Include router
 app.include_router(api_router)
 
+# Innermost, so requests rejected by admission control are never profiled
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Added before CORS so CORS stays outermost and 429s still carry CORS headers
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -218,6 +526,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_db_client():
+    await apply_indexes(db)
+    # May download the tokenizer; never let the first chat request do that
+    await asyncio.to_thread(load_encoding)
+    conversation_reaper.start()
+    question_warmer.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Let in-flight model calls finish and persist their results before Mongo goes away
+    await drain_controller.drain()
+    await question_warmer.stop()
+    await conversation_reaper.stop()
     client.close()
@@ -0,0 +1,42 @@
+"""
+Verify that every registered query shape is served by an index.
+
+Applies the registered indexes to a local mongod, runs explain() on each
+query shape and exits non-zero if any winning plan contains a COLLSCAN or
+an in-memory SORT. Point MONGO_URL/DB_NAME at a scratch database.
+"""
+import asyncio
+import os
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+from db_indexes import QUERIES, apply_indexes, verify_query_plans
+import conversation_store  # noqa: F401 - registers indexes and queries
+import message_store  # noqa: F401
+import evaluation_store  # noqa: F401
+import admission  # noqa: F401
+import question_cache  # noqa: F401
+import idempotency_store  # noqa: F401
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def verify() -> int:
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+    db = client[os.environ.get('VERIFY_DB_NAME', 'index_verification')]
+
+    await apply_indexes(db)
+
+    failures = await verify_query_plans(db)
+    for name, stages in failures.items():
+        print(f"✗ {name}: {' -> '.join(stages)}")
+
+    client.close()
+    print(f"{len(QUERIES) - len(failures)}/{len(QUERIES)} query shapes are index-backed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(verify()))
@@ -2,17 +2,30 @@
 """
 ManuGPT Backend API Testing Suite
 Tests all backend endpoints thoroughly with real scenarios
+
+    python backend_test.py            # against BACKEND_TEST_URL
+    python backend_test.py --local    # starts backend/server.py on recorded AI answers
+
+`--local` needs MongoDB but no network access or EMERGENT_LLM_KEY: the
+backend replays the committed cassette at tests/cassettes/backend_test.jsonl,
+which holds an answer for every prompt this suite sends.
 """
 
 import asyncio
 import aiohttp
 import json
 import os
+import subprocess
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any, List
 
-# Get backend URL from frontend .env file
-BACKEND_URL = "https://smart-dialogue-32.preview.emergentagent.com/api"
+ROOT_DIR = Path(__file__).parent
+CASSETTE_PATH = ROOT_DIR / "tests" / "cassettes" / "backend_test.jsonl"
+LOCAL_PORT = int(os.environ.get("BACKEND_TEST_PORT", "8011"))
+
+BACKEND_URL = os.environ.get("BACKEND_TEST_URL", "https://smart-dialogue-32.preview.emergentagent.com/api")
 
 class BackendTester:
     def __init__(self):
@@ -342,10 +355,49 @@ class BackendTester:
         
         return passed == total
 
+def start_local_backend() -> subprocess.Popen:
+    """Run the backend with every AI call answered from the test cassette"""
+    env = dict(
+        os.environ,
+        LLM_CASSETTE_MODE="replay",
+        LLM_CASSETTE_PATH=str(CASSETTE_PATH),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(LOCAL_PORT)],
+        cwd=ROOT_DIR / "backend",
+        env=env,
+    )
+
+async def wait_until_up(timeout: float = 60.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{BACKEND_URL}/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError(f"Backend did not start at {BACKEND_URL}")
+            await asyncio.sleep(0.5)
+
 async def main():
     """Main test runner"""
-    tester = BackendTester()
-    success = await tester.run_comprehensive_test()
+    global BACKEND_URL
+    server = None
+    if "--local" in sys.argv:
+        BACKEND_URL = f"http://localhost:{LOCAL_PORT}/api"
+        server = start_local_backend()
+    try:
+        if server:
+            await wait_until_up()
+        tester = BackendTester()
+        success = await tester.run_comprehensive_test()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
     
     if success:
         print("\n🎉 All tests passed! ManuGPT backend is working correctly.")
@@ -1,12 +1,16 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import './App.css';
 import Sidebar from './components/Sidebar';
 import ChatInterface from './components/ChatInterface';
 import StealthScreen from './components/StealthScreen';
+import { Toaster } from './components/ui/toaster';
 import axios from 'axios';
+import { postIdempotent } from './lib/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Messages fetched per request; older pages load as the user scrolls up
+const MESSAGE_PAGE_SIZE = 50;
 
 function App() {
   const [conversations, setConversations] = useState([]);
@@ -15,7 +19,7 @@ function App() {
   const [isStealth, setIsStealth] = useState(false);
 
   useEffect(() => {
-    loadConversations();
+    loadConversations(true);
   }, []);
 
   useEffect(() => {
@@ -39,17 +43,22 @@ function App() {
     }
   }, [isStealth]);
 
-  const loadConversations = async () => {
+  const loadConversations = async (selectFirst = false) => {
     try {
       const response = await axios.get(`${API}/conversations`);
       const loadedConversations = response.data.map((conv, index) => ({
         id: conv.id,
         title: conv.title || `Note ${index + 1}`,
         timestamp: new Date(conv.timestamp),
-        messages: []
+        messages: [],
+        hasMore: false
       }));
-      setConversations(loadedConversations);
-      if (loadedConversations.length > 0) {
+      // Keep messages already loaded so refreshing the sidebar does not re-render them
+      setConversations(prev => loadedConversations.map(conv => {
+        const existing = prev.find(c => c.id === conv.id);
+        return existing ? { ...conv, messages: existing.messages, hasMore: existing.hasMore } : conv;
+      }));
+      if (selectFirst && loadedConversations.length > 0) {
         setCurrentConversationId(loadedConversations[0].id);
         await loadConversationMessages(loadedConversations[0].id);
       }
@@ -112,6 +121,44 @@ function App() {
     }
   };
 
+  // `oldest` is the oldest message already loaded; its (created_at, id) is the cursor
+  const fetchMessagePage = async (id, oldest) => {
+    const response = await axios.get(`${API}/conversations/${id}/messages`, {
+      params: {
+        limit: MESSAGE_PAGE_SIZE,
+        ...(oldest ? { before: oldest.created_at, before_id: oldest.id } : {})
+      }
+    });
+    return response.data;
+  };
+
+  const loadConversationMessages = async (id) => {
+    try {
+      const page = await fetchMessagePage(id);
+      setConversations(prev => prev.map(conv => (
+        conv.id === id ? { ...conv, messages: page.messages, hasMore: page.has_more } : conv
+      )));
+    } catch (error) {
+      console.error('Error loading messages:', error);
+    }
+  };
+
+  const loadOlderMessages = async (id) => {
+    const conversation = conversations.find(c => c.id === id);
+    if (!conversation || !conversation.hasMore || conversation.messages.length === 0) return;
+
+    try {
+      const page = await fetchMessagePage(id, conversation.messages[0]);
+      setConversations(prev => prev.map(conv => (
+        conv.id === id
+          ? { ...conv, messages: [...page.messages, ...conv.messages], hasMore: page.has_more }
+          : conv
+      )));
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    }
+  };
+
   const currentConversation = conversations.find(c => c.id === currentConversationId);
 
   const handleNewChat = async () => {
@@ -124,7 +171,8 @@ function App() {
         id: response.data.id,
         title: response.data.title || 'New note',
         timestamp: new Date(response.data.created_at),
-        messages: []
+        messages: [],
+        hasMore: false
       };
       
       setConversations(prev => [newConversation, ...prev]);
@@ -164,7 +212,7 @@ function App() {
     if (!currentConversationId) return;
     
     try {
-      const response = await axios.post(`${API}/chat`, {
+      const response = await postIdempotent(`${API}/chat`, {
         conversation_id: currentConversationId,
         message: message
       });
@@ -214,7 +262,9 @@ function App() {
       <ChatInterface
         conversation={currentConversation}
         onSendMessage={handleSendMessage}
+        onLoadOlder={loadOlderMessages}
       />
+      <Toaster />
     </div>
   );
 }
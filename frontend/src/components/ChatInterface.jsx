@@ -1,22 +1,65 @@
-import React, { useState, useRef, useEffect } from 'react';
+import React, { useState, useRef, useMemo, useLayoutEffect } from 'react';
 import { Send } from 'lucide-react';
 import ChatMessage from './ChatMessage';
 import { Button } from './ui/button';
 import { Textarea } from './ui/textarea';
 import { ScrollArea } from './ui/scroll-area';
 import Logo from './Logo';
+import { useVirtualList } from '../hooks/use-virtual-list';
 
-const ChatInterface = ({ conversation, onSendMessage }) => {
+// Start fetching older messages when scrolled within this distance of the top
+const LOAD_OLDER_THRESHOLD = 300;
+// Treat the view as pinned to the newest message within this distance of the bottom
+const STICK_TO_BOTTOM_THRESHOLD = 80;
+
+const ChatInterface = ({ conversation, onSendMessage, onLoadOlder }) => {
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
-  const scrollRef = useRef(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+  const [scrollElement, setScrollElement] = useState(null);
   const textareaRef = useRef(null);
+  const stickToBottom = useRef(true);
+  const loadingOlder = useRef(false);
+  // Scroll geometry captured before older messages are prepended
+  const anchor = useRef(null);
+
+  const messages = conversation?.messages;
+  const keys = useMemo(() => (messages || []).map((message) => message.id), [messages]);
+  const { items, paddingTop, paddingBottom, totalSize, measureRef } = useVirtualList({ scrollElement, keys });
+
+  useLayoutEffect(() => {
+    stickToBottom.current = true;
+    anchor.current = null;
+  }, [conversation?.id]);
 
-  useEffect(() => {
-    if (scrollRef.current) {
-      scrollRef.current.scrollTop = scrollRef.current.scrollHeight;
+  useLayoutEffect(() => {
+    if (!scrollElement) return;
+    if (anchor.current && keys[0] !== anchor.current.firstKey) {
+      // Keep the message the user was reading in place after prepending
+      scrollElement.scrollTop = anchor.current.top + (scrollElement.scrollHeight - anchor.current.height);
+      anchor.current = null;
+    } else if (stickToBottom.current) {
+      scrollElement.scrollTop = scrollElement.scrollHeight;
     }
-  }, [conversation?.messages]);
+  }, [scrollElement, keys, totalSize, isLoading]);
+
+  const handleScroll = async () => {
+    const element = scrollElement;
+    if (!element) return;
+    stickToBottom.current = element.scrollHeight - element.scrollTop - element.clientHeight < STICK_TO_BOTTOM_THRESHOLD;
+
+    if (element.scrollTop < LOAD_OLDER_THRESHOLD && conversation?.hasMore && onLoadOlder && !loadingOlder.current) {
+      loadingOlder.current = true;
+      setIsLoadingOlder(true);
+      anchor.current = { firstKey: keys[0], top: element.scrollTop, height: element.scrollHeight };
+      try {
+        await onLoadOlder(conversation.id);
+      } finally {
+        loadingOlder.current = false;
+        setIsLoadingOlder(false);
+      }
+    }
+  };
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -25,6 +68,7 @@ const ChatInterface = ({ conversation, onSendMessage }) => {
     const message = input.trim();
     setInput('');
     setIsLoading(true);
+    stickToBottom.current = true;
 
     // Auto-resize textarea back to normal
     if (textareaRef.current) {
@@ -65,10 +109,25 @@ const ChatInterface = ({ conversation, onSendMessage }) => {
           </div>
         </div>
       ) : (
-        <div ref={scrollRef} className="flex-1 overflow-y-auto">
-          {conversation.messages.map((message) => (
-            <ChatMessage key={message.id} message={message} />
-          ))}
+        <div
+          ref={setScrollElement}
+          onScroll={handleScroll}
+          className="flex-1 overflow-y-auto"
+          // Scroll position is restored manually when rows are prepended or re-measured
+          style={{ overflowAnchor: 'none' }}
+        >
+          {isLoadingOlder && (
+            <div className="sticky top-0 z-10 h-0">
+              <div className="py-2 text-center text-xs text-gray-500">Loading earlier notes...</div>
+            </div>
+          )}
+          <div style={{ paddingTop, paddingBottom }}>
+            {items.map(({ index, key }) => (
+              <div key={key} ref={measureRef} data-virtual-key={key} data-virtual-index={index}>
+                <ChatMessage message={messages[index]} />
+              </div>
+            ))}
+          </div>
           {isLoading && (
             <div className="w-full py-6 bg-[#2C2C2C]">
               <div className="max-w-3xl mx-auto px-4 flex gap-4">
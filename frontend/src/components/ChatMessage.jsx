@@ -4,15 +4,73 @@ import { Prism as SyntaxHighlighter } from 'react-syntax-highlighter';
 import { vscDarkPlus } from 'react-syntax-highlighter/dist/esm/styles/prism';
 import { Copy, Check } from 'lucide-react';
 
-const ChatMessage = ({ message }) => {
+const CodeBlock = ({ language, code, ...props }) => {
   const [copied, setCopied] = React.useState(false);
 
-  const copyToClipboard = (text) => {
-    navigator.clipboard.writeText(text);
+  const copyToClipboard = () => {
+    navigator.clipboard.writeText(code);
     setCopied(true);
     setTimeout(() => setCopied(false), 2000);
   };
 
+  return (
+    <div className="relative group my-4">
+      <div className="absolute right-2 top-2 z-10">
+        <button
+          onClick={copyToClipboard}
+          className="p-2 bg-gray-700 hover:bg-gray-600 rounded transition-colors"
+        >
+          {copied ? (
+            <Check className="w-4 h-4 text-green-400" />
+          ) : (
+            <Copy className="w-4 h-4 text-gray-300" />
+          )}
+        </button>
+      </div>
+      <SyntaxHighlighter
+        style={vscDarkPlus}
+        language={language}
+        PreTag="div"
+        customStyle={{
+          margin: 0,
+          borderRadius: '0.5rem',
+          padding: '1rem',
+          fontSize: '0.875rem'
+        }}
+        {...props}
+      >
+        {code}
+      </SyntaxHighlighter>
+    </div>
+  );
+};
+
+// Defined once so ReactMarkdown sees stable component identities across renders
+const markdownComponents = {
+  code({ node, inline, className, children, ...props }) {
+    const match = /language-(\w+)/.exec(className || '');
+    return !inline && match ? (
+      <CodeBlock language={match[1]} code={String(children).replace(/\n$/, '')} {...props} />
+    ) : (
+      <code className="bg-gray-700 px-1.5 py-0.5 rounded text-sm" {...props}>
+        {children}
+      </code>
+    );
+  },
+  p: ({ children }) => <p className="mb-4 leading-7">{children}</p>,
+  ul: ({ children }) => <ul className="list-disc pl-6 mb-4 space-y-2">{children}</ul>,
+  ol: ({ children }) => <ol className="list-decimal pl-6 mb-4 space-y-2">{children}</ol>,
+  strong: ({ children }) => <strong className="font-semibold text-white">{children}</strong>,
+};
+
+// Markdown parsing and syntax highlighting only re-run when the content changes
+const MarkdownContent = React.memo(({ content }) => (
+  <ReactMarkdown components={markdownComponents}>
+    {content}
+  </ReactMarkdown>
+));
+
+const ChatMessage = ({ message }) => {
   const isUser = message.role === 'user';
 
   return (
@@ -22,66 +80,20 @@ const ChatMessage = ({ message }) => {
       <div className="max-w-3xl mx-auto px-4 flex gap-4">
         <div className="flex-shrink-0">
           <div className={`w-8 h-8 rounded-sm flex items-center justify-center text-sm font-bold ${
-            isUser 
-              ? 'bg-gradient-to-br from-blue-500 to-cyan-500 text-white' 
+            isUser
+              ? 'bg-gradient-to-br from-blue-500 to-cyan-500 text-white'
               : 'bg-gradient-to-br from-emerald-400 to-cyan-400 text-gray-900'
           }`}>
             {isUser ? 'Me' : 'AI'}
           </div>
         </div>
-        
+
         <div className="flex-1 overflow-hidden">
           {isUser ? (
             <div className="text-white whitespace-pre-wrap break-words">{message.content}</div>
           ) : (
             <div className="text-gray-200 prose prose-invert max-w-none">
-              <ReactMarkdown
-                components={{
-                  code({ node, inline, className, children, ...props }) {
-                    const match = /language-(\w+)/.exec(className || '');
-                    return !inline && match ? (
-                      <div className="relative group my-4">
-                        <div className="absolute right-2 top-2 z-10">
-                          <button
-                            onClick={() => copyToClipboard(String(children).replace(/\n$/, ''))}
-                            className="p-2 bg-gray-700 hover:bg-gray-600 rounded transition-colors"
-                          >
-                            {copied ? (
-                              <Check className="w-4 h-4 text-green-400" />
-                            ) : (
-                              <Copy className="w-4 h-4 text-gray-300" />
-                            )}
-                          </button>
-                        </div>
-                        <SyntaxHighlighter
-                          style={vscDarkPlus}
-                          language={match[1]}
-                          PreTag="div"
-                          customStyle={{
-                            margin: 0,
-                            borderRadius: '0.5rem',
-                            padding: '1rem',
-                            fontSize: '0.875rem'
-                          }}
-                          {...props}
-                        >
-                          {String(children).replace(/\n$/, '')}
-                        </SyntaxHighlighter>
-                      </div>
-                    ) : (
-                      <code className="bg-gray-700 px-1.5 py-0.5 rounded text-sm" {...props}>
-                        {children}
-                      </code>
-                    );
-                  },
-                  p: ({ children }) => <p className="mb-4 leading-7">{children}</p>,
-                  ul: ({ children }) => <ul className="list-disc pl-6 mb-4 space-y-2">{children}</ul>,
-                  ol: ({ children }) => <ol className="list-decimal pl-6 mb-4 space-y-2">{children}</ol>,
-                  strong: ({ children }) => <strong className="font-semibold text-white">{children}</strong>,
-                }}
-              >
-                {message.content}
-              </ReactMarkdown>
+              <MarkdownContent content={message.content} />
             </div>
           )}
         </div>
@@ -90,4 +102,7 @@ const ChatMessage = ({ message }) => {
   );
 };
 
-export default ChatMessage;
+// Messages are immutable once created: skip re-rendering rows whose message did not change
+export default React.memo(ChatMessage, (prev, next) => (
+  prev.message.id === next.message.id && prev.message.content === next.message.content
+));
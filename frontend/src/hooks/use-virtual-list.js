@@ -0,0 +1,127 @@
+import * as React from "react"
+
+// Windowed rendering for long lists of variable-height rows.
+// Only rows intersecting the viewport (plus `overscan` on each side) are
+// mounted; the rest are represented by top/bottom padding. Row heights start
+// at `estimateSize` and are replaced by measured heights as rows mount.
+
+const findIndex = (offsets, value) => {
+  let low = 0
+  let high = offsets.length - 1
+  while (low < high) {
+    const mid = (low + high + 1) >> 1
+    if (offsets[mid] <= value) {
+      low = mid
+    } else {
+      high = mid - 1
+    }
+  }
+  return low
+}
+
+function useVirtualList({ scrollElement, keys, estimateSize = 120, overscan = 6 }) {
+  const sizes = React.useRef(new Map())
+  const [version, setVersion] = React.useState(0)
+  const [viewport, setViewport] = React.useState({ top: 0, height: 0 })
+  const frame = React.useRef(null)
+  const startRef = React.useRef(0)
+
+  const offsets = React.useMemo(() => {
+    const result = new Array(keys.length + 1)
+    result[0] = 0
+    for (let i = 0; i < keys.length; i++) {
+      result[i + 1] = result[i] + (sizes.current.get(keys[i]) ?? estimateSize)
+    }
+    return result
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [keys, estimateSize, version])
+
+  React.useEffect(() => {
+    const element = scrollElement
+    if (!element) return undefined
+
+    const update = () => {
+      frame.current = null
+      setViewport({ top: element.scrollTop, height: element.clientHeight })
+    }
+    const schedule = () => {
+      if (frame.current === null) {
+        frame.current = requestAnimationFrame(update)
+      }
+    }
+
+    update()
+    element.addEventListener("scroll", schedule, { passive: true })
+    window.addEventListener("resize", schedule)
+    return () => {
+      element.removeEventListener("scroll", schedule)
+      window.removeEventListener("resize", schedule)
+      if (frame.current !== null) {
+        cancelAnimationFrame(frame.current)
+        frame.current = null
+      }
+    }
+  }, [scrollElement])
+
+  const observer = React.useMemo(() => {
+    if (typeof ResizeObserver === "undefined") return null
+    const resizeObserver = new ResizeObserver((entries) => {
+      let changed = false
+      let shiftAbove = 0
+      for (const entry of entries) {
+        // Rows scrolled out of the window are unmounted; keep their last height
+        if (!entry.target.isConnected) {
+          resizeObserver.unobserve(entry.target)
+          continue
+        }
+        const key = entry.target.dataset.virtualKey
+        const index = Number(entry.target.dataset.virtualIndex)
+        const height = entry.target.offsetHeight
+        const previous = sizes.current.get(key) ?? estimateSize
+        if (height !== previous) {
+          sizes.current.set(key, height)
+          changed = true
+          // Rows above the viewport growing or shrinking must not move what the user is reading
+          if (index < startRef.current) {
+            shiftAbove += height - previous
+          }
+        }
+      }
+      if (shiftAbove && scrollElement) {
+        scrollElement.scrollTop += shiftAbove
+      }
+      if (changed) {
+        setVersion((v) => v + 1)
+      }
+    })
+    return resizeObserver
+  }, [scrollElement, estimateSize])
+
+  React.useEffect(() => () => observer?.disconnect(), [observer])
+
+  const measureRef = React.useCallback((element) => {
+    if (element && observer) {
+      observer.observe(element)
+    }
+  }, [observer])
+
+  const total = offsets[keys.length]
+  const first = Math.max(0, findIndex(offsets, viewport.top) - overscan)
+  const last = Math.min(keys.length, findIndex(offsets, viewport.top + viewport.height) + 1 + overscan)
+  startRef.current = first
+
+  const items = []
+  for (let index = first; index < last; index++) {
+    items.push({ index, key: keys[index] })
+  }
+
+  return {
+    items,
+    paddingTop: offsets[first],
+    paddingBottom: total - offsets[last],
+    totalSize: total,
+    measureRef,
+  }
+}
+
+export { useVirtualList }
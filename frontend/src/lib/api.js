@@ -0,0 +1,67 @@
+import axios from 'axios';
+import { toast } from '@/hooks/use-toast';
+
+// Statuses worth retrying: the instance is restarting or a proxy lost it
+const RETRY_STATUSES = [502, 503, 504];
+const MAX_RETRIES = 2;
+// Rate-limit waits up to this long are retried silently; longer ones are shown
+const MAX_RATE_LIMIT_WAIT_SECONDS = 5;
+// 409 means the first request with this key is still running. Poll until it
+// finishes or its claim goes stale on the backend (IDEMPOTENCY_PENDING_SECONDS,
+// 120 s by default), after which a retry takes the call over.
+const PENDING_DEADLINE_MS = 130 * 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const retryAfterSeconds = (error) => Number(error.response?.headers?.['retry-after']) || 1;
+
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost)
+export function newId() {
+  if (typeof crypto !== 'undefined' && crypto.randomUUID) {
+    return crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  if (typeof crypto !== 'undefined' && crypto.getRandomValues) {
+    crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) bytes[i] = Math.floor(Math.random() * 256);
+  }
+  // RFC 4122 version 4 layout
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
+// POST to an AI-backed endpoint, retrying across restarts with one
+// Idempotency-Key so the backend never runs the same model call twice
+export async function postIdempotent(url, data) {
+  const headers = { 'Idempotency-Key': newId() };
+  const startedAt = Date.now();
+  for (let retries = 0; ; ) {
+    try {
+      return await axios.post(url, data, { headers });
+    } catch (error) {
+      const status = error.response?.status;
+      const retryAfter = retryAfterSeconds(error);
+
+      if (status === 409) {
+        if (Date.now() - startedAt + retryAfter * 1000 > PENDING_DEADLINE_MS) throw error;
+      } else if (status === 429) {
+        if (retryAfter > MAX_RATE_LIMIT_WAIT_SECONDS || retries >= MAX_RETRIES) {
+          toast({
+            title: 'Too many requests',
+            description: `Please wait ${Math.ceil(retryAfter)} seconds and try again.`,
+          });
+          throw error;
+        }
+        retries++;
+      } else {
+        const retryable = !error.response || RETRY_STATUSES.includes(status);
+        if (!retryable || retries >= MAX_RETRIES) throw error;
+        retries++;
+      }
+      await sleep(retryAfter * 1000);
+    }
+  }
+}
@@ -4,6 +4,7 @@ import { Card } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Textarea } from '../components/ui/textarea';
 import axios from 'axios';
+import { postIdempotent } from '../lib/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -51,7 +52,7 @@ const MockInterview = ({ role, onBack, onComplete }) => {
     setLoading(true);
 
     try {
-      const response = await axios.post(`${API}/interview/mock-continue`, {
+      const response = await postIdempotent(`${API}/interview/mock-continue`, {
         session_id: sessionId,
         answer: answer,
         role: role
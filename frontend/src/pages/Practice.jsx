@@ -3,11 +3,21 @@ import { ArrowLeft, Send, CheckCircle } from 'lucide-react';
 import { Card } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Textarea } from '../components/ui/textarea';
-import axios from 'axios';
+import { newId, postIdempotent } from '../lib/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Stable across practice rounds so the backend can avoid repeating questions
+const getPracticeSessionId = () => {
+  let sessionId = localStorage.getItem('practiceSessionId');
+  if (!sessionId) {
+    sessionId = newId();
+    localStorage.setItem('practiceSessionId', sessionId);
+  }
+  return sessionId;
+};
+
 const Practice = ({ role, onBack, onComplete }) => {
   const [questions, setQuestions] = useState([]);
   const [currentIndex, setCurrentIndex] = useState(0);
@@ -23,10 +33,11 @@ const Practice = ({ role, onBack, onComplete }) => {
   const loadQuestions = async () => {
     try {
       setLoading(true);
-      const response = await axios.post(`${API}/interview/generate-questions`, {
+      const response = await postIdempotent(`${API}/interview/generate-questions`, {
         role: role,
         count: 5,
-        difficulty: 'mixed'
+        difficulty: 'mixed',
+        session_id: getPracticeSessionId()
       });
       setQuestions(response.data.questions);
     } catch (error) {
@@ -41,10 +52,11 @@ const Practice = ({ role, onBack, onComplete }) => {
 
     setSubmitting(true);
     try {
-      const response = await axios.post(`${API}/interview/evaluate-answer`, {
+      const response = await postIdempotent(`${API}/interview/evaluate-answer`, {
         question: questions[currentIndex],
         answer: answer,
-        role: role
+        role: role,
+        user_id: getPracticeSessionId()
       });
 
       const newAnswers = [...answers, {
@@ -0,0 +1,64 @@
+import asyncio
+
+import admission
+from admission import AdmissionController, MemoryRateLimitBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _take(backend, cost=1.0, capacity=10.0, rate=1.0):
+    return asyncio.run(backend.take("client:route", cost, capacity, rate))
+
+
+def test_bucket_starts_full_and_charges_cost(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    backend = MemoryRateLimitBackend()
+
+    assert _take(backend, cost=4) == (True, 0.0)
+    assert _take(backend, cost=4) == (True, 0.0)
+    allowed, retry_after = _take(backend, cost=4)
+
+    assert not allowed
+    # 2 tokens left, 2 more needed at 1 token/s
+    assert retry_after == 2.0
+
+
+def test_bucket_refills_over_time_up_to_capacity(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    backend = MemoryRateLimitBackend()
+
+    assert _take(backend, cost=10)[0]
+    assert not _take(backend, cost=1)[0]
+    clock.now += 3
+    assert _take(backend, cost=3)[0]
+    assert not _take(backend, cost=1)[0]
+
+    clock.now += 1000
+    assert _take(backend, cost=10)[0]
+    assert not _take(backend, cost=1)[0]
+
+
+def test_default_limits_allow_an_interactive_chat_session():
+    controller = AdmissionController(MemoryRateLimitBackend())
+
+    results = [asyncio.run(controller.admit("10.0.0.1", "/api/chat")) for _ in range(30)]
+
+    assert all(reason is None for reason, _ in results)
+
+
+def test_rejections_are_counted_per_route_not_per_path(monkeypatch):
+    monkeypatch.setattr(admission, "RATE_LIMIT_CAPACITY", 1.0)
+    controller = AdmissionController(MemoryRateLimitBackend())
+
+    for path in ("/api/conversations/a", "/api/conversations/b", "/api/conversations/c"):
+        asyncio.run(controller.admit("10.0.0.1", path))
+
+    assert dict(controller.rejected) == {"rate_limited:default": 2}
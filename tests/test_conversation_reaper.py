@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import conversation_reaper
+from conversation_reaper import ConversationReaper
+from conversation_store import ConversationStore
+
+
+def _matches(doc, query):
+    for field, cond in query.items():
+        value = doc.get(field)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$lt" and (value is None or not value < arg):
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, n):
+        return self.docs[:n]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def with_options(self, **kwargs):
+        return self
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if _matches(d, query)), None)
+
+    async def update_many(self, query, update):
+        matched = [d for d in self.docs if _matches(d, query)]
+        for doc in matched:
+            doc.update(update["$set"])
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def delete_one(self, query):
+        matched = [d for d in self.docs if _matches(d, query)][:1]
+        self.docs[:] = [d for d in self.docs if d not in matched]
+
+
+class FakeMessageStore:
+    def __init__(self, counts):
+        self.counts = counts
+        self.batches = []
+
+    async def delete_batch(self, conversation_id, limit):
+        deleted = min(limit, self.counts.get(conversation_id, 0))
+        self.counts[conversation_id] = self.counts.get(conversation_id, 0) - deleted
+        self.batches.append((conversation_id, deleted))
+        return deleted
+
+
+NOW = datetime.now(timezone.utc)
+
+
+def _conversation_store(*docs):
+    return ConversationStore(SimpleNamespace(conversations=FakeCollection(list(docs))))
+
+
+@pytest.fixture(autouse=True)
+def no_pauses(monkeypatch):
+    monkeypatch.setattr(conversation_reaper, "REAPER_BATCH_PAUSE_SECONDS", 0)
+
+
+def test_soft_delete_hides_the_conversation_but_keeps_it_for_the_reaper():
+    store = _conversation_store({"id": "c1", "deleted_at": None}, {"id": "c2", "deleted_at": None})
+
+    assert asyncio.run(store.soft_delete(["c1", "missing"])) == 1
+    assert asyncio.run(store.soft_delete(["c1"])) == 0
+
+    assert not asyncio.run(store.is_live("c1"))
+    assert asyncio.run(store.is_live("c2"))
+    assert [d["id"] for d in store.collection.docs] == ["c1", "c2"]
+
+
+def test_reaper_purges_messages_in_batches_then_the_conversation(monkeypatch):
+    monkeypatch.setattr(conversation_reaper, "REAPER_BATCH_SIZE", 2)
+    store = _conversation_store({"id": "c1", "deleted_at": NOW - timedelta(hours=1)}, {"id": "c2", "deleted_at": None})
+    messages = FakeMessageStore({"c1": 5, "c2": 3})
+
+    purged = asyncio.run(ConversationReaper(store, messages).run_once())
+
+    assert purged == 1
+    assert messages.batches == [("c1", 2), ("c1", 2), ("c1", 1)]
+    assert messages.counts == {"c1": 0, "c2": 3}
+    assert [d["id"] for d in store.collection.docs] == ["c2"]
+
+
+def test_reaper_waits_out_the_grace_period():
+    store = _conversation_store({"id": "c1", "deleted_at": NOW})
+    messages = FakeMessageStore({"c1": 1})
+
+    assert asyncio.run(ConversationReaper(store, messages).run_once()) == 0
+    assert messages.batches == []
+    assert [d["id"] for d in store.collection.docs] == ["c1"]
+
+
+def test_retention_soft_deletes_stale_conversations(monkeypatch):
+    monkeypatch.setattr(conversation_reaper, "CONVERSATION_RETENTION_DAYS", 30)
+    store = _conversation_store(
+        {"id": "old", "deleted_at": None, "updated_at": NOW - timedelta(days=31)},
+        {"id": "new", "deleted_at": None, "updated_at": NOW},
+    )
+
+    asyncio.run(ConversationReaper(store, FakeMessageStore({})).run_once())
+
+    assert not asyncio.run(store.is_live("old"))
+    assert asyncio.run(store.is_live("new"))
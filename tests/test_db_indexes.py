@@ -0,0 +1,74 @@
+import asyncio
+
+import db_indexes
+from db_indexes import QueryShape, explain_query, verify_query_plans
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, sort):
+        return self
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class FakeDb:
+    def __init__(self, plans):
+        self.plans = plans
+        self.commands = []
+
+    def __getitem__(self, collection):
+        db = self
+
+        class Collection:
+            def find(self, filter, projection=None):
+                return FakeCursor(db.plans[collection])
+        return Collection()
+
+    async def command(self, name, collection, pipeline, explain):
+        self.commands.append(pipeline)
+        return {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": self.plans[collection]}}}]}
+
+
+IXSCAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+
+
+def test_pipeline_is_explained_up_to_the_first_group():
+    db = FakeDb({"demand": IXSCAN})
+    pipeline = [{"$match": {"day": 1}}, {"$group": {"_id": "$key"}}, {"$sort": {"n": -1}}]
+
+    stages = asyncio.run(explain_query(db, QueryShape("demand.top", "demand", {}, pipeline=pipeline)))
+
+    assert stages == ["FETCH", "IXSCAN"]
+    assert db.commands == [pipeline[:2]]
+
+
+def test_verify_query_plans_reports_collection_scans(monkeypatch):
+    monkeypatch.setattr(db_indexes, "QUERIES", [
+        QueryShape("good", "good", {"a": 1}, sort=[("b", 1)]),
+        QueryShape("bad", "bad", {"a": 1}),
+    ])
+    db = FakeDb({"good": IXSCAN, "bad": {"stage": "COLLSCAN"}})
+
+    assert asyncio.run(verify_query_plans(db)) == {"bad": ["COLLSCAN"]}
+
+
+def test_registered_shapes_cover_every_filter_variant():
+    import conversation_store, message_store, question_cache  # noqa: F401 - register their shapes
+
+    names = [shape.name for shape in db_indexes.QUERIES]
+    shapes = {shape.name: shape for shape in db_indexes.QUERIES}
+
+    assert len(names) == len(set(names))
+    for store in ("messages", "message_buckets"):
+        for variant in ("page_newest", "page_before", "page", "history", "history_since"):
+            assert f"{store}.{variant}" in shapes
+    assert shapes["messages.page_before"].filter == message_store.page_filter(
+        db_indexes.SAMPLE_ID, db_indexes.SAMPLE_TIME, None
+    )
+    assert shapes["question_sets.count_fresh"].filter == question_cache.fresh_filter(
+        db_indexes.SAMPLE_TIME, db_indexes.SAMPLE_ID
+    )
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import drain
+from drain import DrainController, is_drain_admin
+
+
+def _controller():
+    return DrainController(SimpleNamespace(draining=False))
+
+
+def test_drain_stops_admission_and_waits_for_protected_work():
+    async def scenario():
+        controller = _controller()
+        done = []
+
+        async def work():
+            await asyncio.sleep(0.01)
+            done.append(True)
+            return "saved"
+
+        result = controller.protect(work())
+        assert controller.in_flight == 1
+        remaining = await controller.drain(timeout=1)
+        return controller, done, remaining, await result
+
+    controller, done, remaining, result = asyncio.run(scenario())
+
+    assert controller.draining
+    assert (done, remaining, result) == ([True], 0, "saved")
+    assert controller.in_flight == 0
+
+
+def test_protected_work_survives_cancellation_of_the_caller():
+    async def scenario():
+        controller = _controller()
+        done = []
+
+        async def work():
+            await asyncio.sleep(0.01)
+            done.append(True)
+
+        caller = asyncio.ensure_future(controller.protect(work()))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await controller.drain(timeout=1)
+        return done
+
+    assert asyncio.run(scenario()) == [True]
+
+
+def test_drain_reports_work_still_running_at_the_deadline():
+    async def scenario():
+        controller = _controller()
+        controller.protect(asyncio.sleep(1))
+        return await controller.drain(timeout=0.01)
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_drain_token_is_separate_from_the_profiler(monkeypatch):
+    monkeypatch.setattr(drain, "DRAIN_ADMIN_TOKEN", "")
+    assert not is_drain_admin("")
+
+    monkeypatch.setattr(drain, "DRAIN_ADMIN_TOKEN", "secret")
+    assert is_drain_admin("secret")
+    assert not is_drain_admin("wrong")
+    assert not is_drain_admin(None)
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from evaluation_store import EvaluationStore, _bucket, _key, _score
+
+store = EvaluationStore(SimpleNamespace(evaluations=None, evaluation_rollups=None))
+_summarize = store._summarize
+
+
+def test_key_normalizes_case_whitespace_and_symbols():
+    assert _key("  Backend   Engineer ") == "backend engineer"
+    assert _key("C++ / $where.x") == "c  wherex"
+    assert _key("$.") == "general"
+
+
+def test_score_is_clamped_and_defaults_to_zero():
+    assert _score({"score": "8.5"}) == 8.5
+    assert _score({"score": 42}) == 10.0
+    assert _score({"score": -1}) == 0.0
+    assert _score({"score": "n/a"}) == 0.0
+    assert _score({}) == 0.0
+
+
+def test_bucket_edges():
+    assert _bucket(0) == "0-1"
+    assert _bucket(1.9) == "0-1"
+    assert _bucket(2) == "2-3"
+    assert _bucket(7.99) == "6-7"
+    assert _bucket(10) == "8-10"
+
+
+def test_summarize_rollup():
+    summary = _summarize({
+        "role": "Backend Engineer",
+        "count": 4,
+        "score_sum": 26.0,
+        "buckets": {"4-5": 1, "6-7": 2, "8-10": 1},
+        "categories": {
+            "easy": {"count": 2, "score_sum": 15.0},
+            "hard": {"count": 1, "score_sum": 4.0},
+            "medium": {"count": 1, "score_sum": 7.0},
+            "empty": {"count": 0, "score_sum": 0.0},
+        },
+    })
+
+    assert summary["count"] == 4
+    assert summary["mean_score"] == 6.5
+    assert summary["distribution"] == {"0-1": 0, "2-3": 0, "4-5": 1, "6-7": 2, "8-10": 1}
+    assert summary["categories"] == {"easy": 7.5, "hard": 4.0, "medium": 7.0}
+    assert summary["weakest_categories"] == ["hard", "medium", "easy"]
+
+
+def test_summarize_empty_rollup():
+    summary = _summarize({"role": "Backend Engineer"})
+
+    assert summary["count"] == 0
+    assert summary["mean_score"] is None
+    assert summary["categories"] == {}
+    assert summary["weakest_categories"] == []
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import idempotency_store
+from idempotency_store import IdempotencyConflict, IdempotencyMismatch, IdempotencyStore, request_hash
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if not doc or doc["status"] != query["status"] or not doc["created_at"] < query["created_at"]["$lt"]:
+            return None
+        before = dict(doc)
+        doc.update(update["$set"])
+        return before
+
+    async def update_one(self, query, update):
+        if query["_id"] in self.docs:
+            self.docs[query["_id"]].update(update["$set"])
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc and doc["status"] == query["status"]:
+            del self.docs[query["_id"]]
+
+
+BODY = request_hash({"role": "SRE", "count": 5})
+
+
+def _store():
+    return IdempotencyStore(SimpleNamespace(idempotency_keys=FakeCollection()))
+
+
+def test_request_hash_ignores_key_order():
+    assert request_hash({"a": 1, "b": 2}) == request_hash({"b": 2, "a": 1})
+    assert request_hash({"a": 1}) != request_hash({"a": 2})
+
+
+def test_first_claim_runs_and_a_retry_gets_the_stored_result():
+    store = _store()
+
+    assert asyncio.run(store.claim("chat", "k1", BODY)) is None
+    asyncio.run(store.complete("chat", "k1", {"answer": 42}))
+
+    assert asyncio.run(store.claim("chat", "k1", BODY)) == {"answer": 42}
+
+
+def test_claim_conflicts_while_the_first_request_is_running():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(store.claim("chat", "k1", BODY))
+
+
+def test_keys_are_scoped_per_route():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+
+    assert asyncio.run(store.claim("evaluate_answer", "k1", BODY)) is None
+
+
+def test_stale_claim_is_taken_over():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+    stale = datetime.now(timezone.utc) - timedelta(seconds=idempotency_store.IDEMPOTENCY_PENDING_SECONDS + 1)
+    store.collection.docs["chat:k1"]["created_at"] = stale
+
+    assert asyncio.run(store.claim("chat", "k1", BODY)) is None
+    assert store.collection.docs["chat:k1"]["created_at"] > stale
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(store.claim("chat", "k1", BODY))
+
+
+def test_release_lets_the_client_retry():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+
+    asyncio.run(store.release("chat", "k1"))
+
+    assert asyncio.run(store.claim("chat", "k1", BODY)) is None
+
+
+def test_release_keeps_completed_results():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+    asyncio.run(store.complete("chat", "k1", {"answer": 42}))
+
+    asyncio.run(store.release("chat", "k1"))
+
+    assert asyncio.run(store.claim("chat", "k1", BODY)) == {"answer": 42}
+
+
+def test_reused_key_with_a_different_body_is_rejected():
+    store = _store()
+    asyncio.run(store.claim("chat", "k1", BODY))
+    asyncio.run(store.complete("chat", "k1", {"answer": 42}))
+
+    with pytest.raises(IdempotencyMismatch):
+        asyncio.run(store.claim("chat", "k1", request_hash({"role": "SRE", "count": 6})))
+
+
+def test_overlong_key_is_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(_store().claim("chat", "k" * (idempotency_store.MAX_KEY_LENGTH + 1), BODY))
@@ -0,0 +1,39 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from llm_cassette import Cassette, CassetteMiss, cassette_key, iter_records
+from prompt_builder import build_chat_prompt
+
+BACKEND_TEST_CASSETTE = Path(__file__).parent / "cassettes" / "backend_test.jsonl"
+
+
+def test_key_depends_on_model():
+    assert cassette_key("chat", "openai/gpt-4o-mini", "sys", "hi") != cassette_key("chat", "gemini/gemini-2.0-flash", "sys", "hi")
+
+
+@pytest.mark.parametrize("name", ["llm.jsonl.gz", "llm.jsonl"])
+def test_record_then_replay(tmp_path, name):
+    path = str(tmp_path / "cassettes" / name)
+    recorder = Cassette(path, mode="record")
+    asyncio.run(recorder.record("chat", "gemini/gemini-2.0-flash", "sys", "hi", "hello", 12.34))
+
+    player = Cassette(path, mode="replay")
+    models = ["openai/gpt-4o-mini", "gemini/gemini-2.0-flash"]
+
+    assert asyncio.run(player.replay("chat", models, "sys", "hi")) == "hello"
+    with pytest.raises(CassetteMiss):
+        asyncio.run(player.replay("chat", models, "sys", "bye"))
+    assert asyncio.run(Cassette(path, mode="auto").replay("chat", models, "sys", "bye")) is None
+
+
+def test_backend_test_cassette_matches_current_prompts():
+    # backend_test.py --local replays this file; a prompt template change
+    # must come with a re-recorded cassette
+    records = list(iter_records(str(BACKEND_TEST_CASSETTE)))
+    assert records
+    for record in records:
+        prompt = build_chat_prompt(record["prompt"], [])
+        assert (record["system"], record["prompt"]) == (prompt.system_message, prompt.text)
+        assert record["key"] == cassette_key(record["task"], record["model"], record["system"], record["prompt"])
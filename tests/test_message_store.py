@@ -0,0 +1,132 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from message_store import BucketMessageStore, DocumentMessageStore
+
+OPS = {"$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b, "$gt": lambda a, b: a > b}
+
+
+def _matches(doc, query):
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            if not all(OPS[op](doc[field], value) for op, value in cond.items()):
+                return False
+        elif doc.get(field) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=None):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=order == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return self.docs[:n]
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if _matches(d, query)])
+
+
+T0 = datetime(2024, 1, 1)
+# Three messages share each timestamp, so page boundaries fall inside ties
+MESSAGES = [
+    {"id": f"m{i:02d}", "conversation_id": "c1", "role": "user", "content": str(i),
+     "created_at": T0 + timedelta(seconds=i // 3)}
+    for i in range(20)
+]
+
+
+def _document_store():
+    return DocumentMessageStore(SimpleNamespace(messages=FakeCollection(MESSAGES)))
+
+
+def _bucket(messages):
+    return {
+        "conversation_id": "c1",
+        "first_at": messages[0]["created_at"],
+        "last_at": messages[-1]["created_at"],
+        "count": len(messages),
+        "messages": [{k: v for k, v in m.items() if k != "conversation_id"} for m in messages],
+    }
+
+
+def _bucket_store(bucket_size=4):
+    buckets = [_bucket(MESSAGES[i:i + bucket_size]) for i in range(0, len(MESSAGES), bucket_size)]
+    return BucketMessageStore(SimpleNamespace(message_buckets=FakeCollection(buckets)), bucket_size)
+
+
+def _all_pages(store, limit):
+    pages = []
+    before = before_id = None
+    while True:
+        page, has_more = asyncio.run(store.page("c1", before, limit, before_id))
+        pages.append(page)
+        if not has_more:
+            return pages
+        before, before_id = page[0]["created_at"], page[0]["id"]
+
+
+@pytest.mark.parametrize("make_store", [_document_store, _bucket_store])
+@pytest.mark.parametrize("limit", [1, 2, 4, 7, 20, 50])
+def test_paging_through_ties_returns_every_message_once(make_store, limit):
+    pages = _all_pages(make_store(), limit)
+
+    ids = [m["id"] for page in reversed(pages) for m in page]
+    assert ids == [m["id"] for m in MESSAGES]
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+@pytest.mark.parametrize("make_store", [_document_store, _bucket_store])
+def test_timestamp_only_cursor_still_means_strictly_before(make_store):
+    page, has_more = asyncio.run(make_store().page("c1", T0 + timedelta(seconds=2), 50))
+
+    assert [m["id"] for m in page] == [f"m{i:02d}" for i in range(6)]
+    assert not has_more
+
+
+@pytest.mark.parametrize("make_store", [_document_store, _bucket_store])
+def test_history_loads_only_the_newest_messages(make_store):
+    history = asyncio.run(make_store().history("c1", limit=5))
+
+    assert [m["content"] for m in history] == [str(i) for i in range(15, 20)]
+
+
+@pytest.mark.parametrize("make_store", [_document_store, _bucket_store])
+def test_history_since_is_exclusive(make_store):
+    history = asyncio.run(make_store().history("c1", since=T0 + timedelta(seconds=5)))
+
+    assert [m["content"] for m in history] == [str(i) for i in range(18, 20)]
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+import time
+from types import ModuleType
+
+import pytest
+
+# The module builds its singleton at import time, which needs a key
+os.environ.setdefault("EMERGENT_LLM_KEY", "test-key")
+
+import model_router
+from model_router import CHAT, EVALUATION, ModelRouter, ModelStats
+
+
+@pytest.fixture
+def router():
+    router = ModelRouter()
+    router.policy = {CHAT: ["a/fast", "b/slow", "c/cheap"], EVALUATION: ["a/fast", "b/slow"]}
+    router.prices = {"a/fast": (1.0, 1.0), "b/slow": (1.0, 1.0), "c/cheap": (0.1, 0.1)}
+    return router
+
+
+def _measure(router, model, latency_ms, error_rate=0.0):
+    router.stats[model] = ModelStats(latency_ms=latency_ms, error_rate=error_rate, calls=1)
+
+
+def test_evaluation_keeps_the_baseline_model_first():
+    assert model_router.DEFAULT_POLICY[EVALUATION][0] == "openai/gpt-4o-mini"
+
+
+def test_light_tasks_prefer_unmeasured_then_fastest(router):
+    _measure(router, "a/fast", 100)
+    _measure(router, "b/slow", 900)
+
+    assert router.candidates(CHAT) == ["c/cheap", "a/fast", "b/slow"]
+
+
+def test_light_task_ties_go_to_the_cheaper_model(router):
+    assert router.candidates(CHAT) == ["c/cheap", "a/fast", "b/slow"]
+
+
+def test_heavy_tasks_keep_policy_order(router):
+    _measure(router, "a/fast", 900)
+    _measure(router, "b/slow", 100)
+
+    assert router.candidates(EVALUATION) == ["a/fast", "b/slow"]
+
+
+def test_degraded_models_sort_last_among_healthy(router):
+    _measure(router, "a/fast", 100, error_rate=0.9)
+    _measure(router, "b/slow", 900)
+
+    assert router.candidates(EVALUATION) == ["b/slow", "a/fast"]
+
+
+def test_circuit_opens_after_consecutive_failures_and_cools_down(router, monkeypatch):
+    stats = router.stats.setdefault("a/fast", ModelStats())
+    for _ in range(model_router.FAILURE_THRESHOLD):
+        stats.record(10, ok=False)
+
+    assert router.candidates(EVALUATION) == ["b/slow", "a/fast"]
+
+    later = time.monotonic() + model_router.COOLDOWN_SECONDS + 1
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: later)
+    assert stats.healthy(later)
+    assert router.candidates(EVALUATION) == ["a/fast", "b/slow"]
+
+
+def test_success_resets_the_failure_streak():
+    stats = ModelStats()
+    for _ in range(model_router.FAILURE_THRESHOLD - 1):
+        stats.record(10, ok=False)
+    stats.record(10, ok=True)
+    stats.record(10, ok=False)
+
+    assert stats.consecutive_failures == 1
+    assert stats.healthy(time.monotonic())
+
+
+def test_send_message_fails_over_and_records_cost(router, monkeypatch):
+    calls = []
+
+    class LlmChat:
+        def __init__(self, api_key, session_id, system_message):
+            pass
+
+        def with_model(self, provider, model_name):
+            self.model = f"{provider}/{model_name}"
+
+        async def send_message(self, message):
+            calls.append(self.model)
+            if self.model == "a/fast":
+                raise RuntimeError("provider down")
+            return "answer"
+
+    chat_module = ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = LlmChat
+    chat_module.UserMessage = lambda text: text
+    monkeypatch.setitem(sys.modules, "emergentintegrations", ModuleType("emergentintegrations"))
+    monkeypatch.setitem(sys.modules, "emergentintegrations.llm", ModuleType("emergentintegrations.llm"))
+    monkeypatch.setitem(sys.modules, "emergentintegrations.llm.chat", chat_module)
+
+    response = asyncio.run(router.send_message(EVALUATION, "s1", "system", "question"))
+
+    assert response == "answer"
+    assert calls == ["a/fast", "b/slow"]
+    assert router.stats["a/fast"].errors == 1
+    assert router.stats["b/slow"].cost_usd > 0
+    assert router.snapshot()["b/slow"]["cost_usd"] > 0
+
+
+def test_uncapped_lane_does_not_limit_concurrency(router, monkeypatch):
+    monkeypatch.setitem(model_router.LANE_LIMITS, "heavy", 0)
+
+    assert not isinstance(router._lane(EVALUATION), asyncio.Semaphore)
@@ -0,0 +1,38 @@
+import pytest
+from pymongo import MongoClient
+
+from mongo_config import WRITE_CONCERNS, _load_write_tiers, client_options, for_write
+
+
+def test_write_tier_overrides_are_validated():
+    tiers = _load_write_tiers('{"conversation.touch": "durable"}')
+    assert tiers["conversation.touch"] == "durable"
+    assert tiers["message.append"] == "durable"
+
+    with pytest.raises(ValueError):
+        _load_write_tiers('{"conversation.touch": "durible"}')
+    with pytest.raises(ValueError):
+        _load_write_tiers('["fast"]')
+
+
+def test_invalid_json_keeps_default_tiers():
+    assert _load_write_tiers("{not json") == _load_write_tiers("")
+
+
+def test_for_write_caches_per_collection_object():
+    first = MongoClient(connect=False).app.messages
+    second = MongoClient(connect=False).app.messages
+
+    tiered = for_write(first, "message.append")
+
+    assert tiered.write_concern == WRITE_CONCERNS["durable"]
+    assert for_write(first, "message.append") is tiered
+    assert for_write(first, "message.purge").write_concern == WRITE_CONCERNS["fast"]
+    # Same names on another client must not reuse the first client's collection
+    assert for_write(second, "message.append") is not tiered
+    assert for_write(second, "message.append").database.client is second.database.client
+
+
+def test_unknown_profile_falls_back_to_default(monkeypatch):
+    monkeypatch.delenv("MONGO_MAX_POOL_SIZE", raising=False)
+    assert client_options("no-such-profile") == client_options("default")
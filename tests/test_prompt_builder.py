@@ -0,0 +1,93 @@
+from prompt_builder import build_chat_prompt, build_prompt, count_tokens, fold_summary, QUESTION_GEN, QUESTION_GEN_SYSTEM
+
+
+def _history(count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message number {i}"}
+        for i in range(count)
+    ]
+
+
+def test_window_keeps_newest_and_evicts_the_rest():
+    history = _history(10)
+    prompt = build_chat_prompt("next", history, budget=10_000, window=4)
+
+    assert [m["content"] for m in prompt.evicted] == [f"message number {i}" for i in range(6)]
+    assert "message number 9" in prompt.text
+    assert "message number 6" in prompt.text
+    assert "message number 5" not in prompt.text
+    assert prompt.text.endswith("Me: next")
+
+
+def test_budget_evicts_before_window():
+    history = _history(10)
+    line_tokens = count_tokens("Me: message number 9") + 1
+    prompt = build_chat_prompt("next", history, budget=line_tokens * 3, window=10)
+
+    assert len(prompt.evicted) == 7
+    assert prompt.summary is not None
+    assert "message number 0" in prompt.summary
+    assert prompt.summary in prompt.system_message
+
+
+def test_nothing_evicted_keeps_summary_untouched():
+    prompt = build_chat_prompt("hi", _history(2), summary="- Me: earlier", budget=10_000, window=10)
+
+    assert prompt.evicted == []
+    assert prompt.summary == "- Me: earlier"
+    assert prompt.prompt_tokens == count_tokens(prompt.system_message) + count_tokens(prompt.text)
+
+
+def test_empty_history_sends_message_alone():
+    prompt = build_chat_prompt("hello", [])
+
+    assert prompt.text == "hello"
+    assert prompt.evicted == []
+
+
+def test_fold_summary_appends_labelled_lines():
+    summary = fold_summary("- Me: first", [{"role": "assistant", "content": "an   answer\nwith lines"}], budget=1000)
+
+    assert summary == "- Me: first\n- AI: an answer with lines"
+
+
+def test_fold_summary_drops_oldest_lines_to_fit_budget():
+    evicted = [{"role": "user", "content": f"note {i} " + "x" * 40} for i in range(20)]
+    budget = count_tokens(fold_summary(None, evicted[-3:], budget=10_000))
+    summary = fold_summary(None, evicted, budget=budget)
+
+    assert count_tokens(summary) <= budget
+    assert "note 19" in summary
+    assert "note 0 " not in summary
+
+
+def test_fold_summary_truncates_long_messages():
+    summary = fold_summary(None, [{"role": "user", "content": "y" * 1000}], budget=10_000)
+
+    assert summary.endswith("...")
+    assert len(summary) < 300
+
+
+def test_fold_summary_empty_is_none():
+    assert fold_summary(None, [], budget=100) is None
+
+
+def test_build_prompt_substitutes_values():
+    prompt = build_prompt(QUESTION_GEN_SYSTEM, QUESTION_GEN, count=3, role="SRE", difficulty="hard")
+
+    assert "Generate 3 interview questions for a SRE position." in prompt.text
+    assert "Difficulty level: hard" in prompt.text
+    assert prompt.prompt_tokens > 0
+
+
+def test_fold_summary_counts_only_the_lines_it_keeps(monkeypatch):
+    import prompt_builder
+
+    calls = []
+    monkeypatch.setattr(prompt_builder, "count_tokens", lambda text: calls.append(text) or 10)
+    evicted = [{"role": "user", "content": f"note {i}"} for i in range(2000)]
+
+    summary = fold_summary(None, evicted, budget=100)
+
+    assert summary.splitlines() == [f"- Me: note {i}" for i in range(1991, 2000)]
+    assert len(calls) == 10
@@ -0,0 +1,81 @@
+import asyncio
+
+from question_cache import QuestionCache, cache_key
+from question_warmup import QuestionWarmer
+
+
+def _set(set_id, size, role="Backend Engineer", difficulty="mixed"):
+    questions = [{"text": f"{set_id} question {i}"} for i in range(size)]
+    return {"_id": set_id, "key": cache_key(role, difficulty), "questions": questions}
+
+
+class FakeStore:
+    def __init__(self, sets, fail_claim=False):
+        self.sets = sets
+        self.fail_claim = fail_claim
+        self.consumed = []
+
+    async def claim(self, set_id):
+        if self.fail_claim:
+            raise RuntimeError("mongo down")
+        if set_id in self.consumed:
+            return False
+        self.consumed.append(set_id)
+        return True
+
+    async def load_sets(self):
+        return [s for s in self.sets if s["_id"] not in self.consumed]
+
+
+def test_cache_key_ignores_case_and_whitespace():
+    assert cache_key("  Backend   engineer", " Mixed ") == cache_key("backend engineer", "mixed")
+
+
+def test_take_serves_each_set_once_and_skips_short_sets():
+    store = FakeStore([_set("a", 3), _set("b", 10), _set("c", 10)])
+    cache = QuestionCache(store)
+    cache.load(store.sets)
+
+    first = asyncio.run(cache.take("backend engineer", "mixed", 5))
+    second = asyncio.run(cache.take("Backend Engineer", "mixed", 5))
+
+    assert {q["text"].split()[0] for q in first + second} == {"b", "c"}
+    assert asyncio.run(cache.take("Backend Engineer", "mixed", 5)) is None
+    assert store.consumed == ["b", "c"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_set_claimed_by_another_instance_is_skipped():
+    store = FakeStore([_set("a", 10), _set("b", 10)])
+    other, cache = QuestionCache(store), QuestionCache(store)
+    other.load(store.sets)
+    cache.load(store.sets)
+
+    asyncio.run(other.take("Backend Engineer", "mixed", 5))
+    taken = asyncio.run(cache.take("Backend Engineer", "mixed", 5))
+
+    assert {q["text"].split()[0] for q in taken} == {"b"}
+    assert cache.lost_claims == 1
+    assert asyncio.run(cache.take("Backend Engineer", "mixed", 5)) is None
+
+
+def test_failed_claim_is_a_miss_and_keeps_the_set_out_of_the_pool():
+    store = FakeStore([_set("a", 10), _set("b", 10)], fail_claim=True)
+    cache = QuestionCache(store)
+    cache.load(store.sets)
+
+    assert asyncio.run(cache.take("Backend Engineer", "mixed", 5)) is None
+    assert [s["_id"] for s in cache.pools[cache_key("Backend Engineer", "mixed")]] == ["b"]
+
+
+def test_reload_skips_consumed_sets():
+    store = FakeStore([_set("a", 10), _set("b", 10)])
+    cache = QuestionCache(store)
+    warmer = QuestionWarmer(store, cache)
+    asyncio.run(warmer.reload())
+
+    asyncio.run(cache.take("Backend Engineer", "mixed", 5))
+    asyncio.run(warmer.reload())
+
+    assert store.consumed == ["a"]
+    assert [s["_id"] for s in cache.pools[cache_key("Backend Engineer", "mixed")]] == ["b"]
@@ -0,0 +1,108 @@
+import pytest
+
+from question_index import QuestionBank, NotEnoughQuestions, dedupe, embed
+
+
+def _questions(*texts):
+    return [{"text": text, "difficulty": "Medium"} for text in texts]
+
+
+QUESTIONS = _questions(
+    "Explain the difference between a process and a thread.",
+    "How does garbage collection work in Python?",
+    "Describe a time you resolved a conflict with a teammate.",
+    "What is the CAP theorem?",
+    "How would you design a URL shortener?",
+    "What happens when you type a URL into a browser?",
+)
+
+
+def test_dedupe_drops_near_duplicates_and_keeps_first():
+    vectors = embed([
+        "What is the CAP theorem?",
+        "What is the CAP theorem ?",
+        "How would you design a URL shortener?",
+    ])
+
+    assert dedupe(vectors) == [0, 2]
+
+
+def test_embed_rows_are_unit_norm():
+    vectors = embed(["How does garbage collection work in Python?", ""])
+
+    assert abs(float((vectors[0] ** 2).sum()) - 1.0) < 1e-5
+    assert not vectors[1].any()
+
+
+def test_select_drops_duplicates_and_tops_up_from_bank():
+    bank = QuestionBank()
+    bank.select("Backend Engineer", QUESTIONS[3:], 3)
+
+    duplicated = QUESTIONS[:3] + QUESTIONS[:1]
+    selected = bank.select("Backend Engineer", duplicated, 4)
+
+    texts = [q["text"] for q in selected]
+    assert len(texts) == 4
+    assert len(set(texts)) == 4
+    assert texts[:3] == [q["text"] for q in QUESTIONS[:3]]
+
+
+def test_select_hides_questions_the_session_has_seen():
+    bank = QuestionBank()
+    first = bank.select("Backend Engineer", QUESTIONS[:3], 3, session_id="s1")
+    second = bank.select("Backend Engineer", QUESTIONS[:3] + QUESTIONS[3:], 3, session_id="s1")
+
+    assert not {q["text"] for q in first} & {q["text"] for q in second}
+
+
+def test_select_reuses_seen_questions_instead_of_returning_short():
+    bank = QuestionBank()
+    bank.select("Backend Engineer", QUESTIONS[:3], 3, session_id="s1")
+
+    selected = bank.select("Backend Engineer", QUESTIONS[:3], 3, session_id="s1")
+
+    assert sorted(q["text"] for q in selected) == sorted(q["text"] for q in QUESTIONS[:3])
+
+
+def test_select_raises_when_there_are_not_enough_distinct_questions():
+    bank = QuestionBank()
+
+    with pytest.raises(NotEnoughQuestions):
+        bank.select("Backend Engineer", QUESTIONS[:2], 3)
+
+
+def test_role_banks_are_lru_capped():
+    bank = QuestionBank(max_roles=2)
+    bank.select("Frontend", QUESTIONS[:1], 1)
+    bank.select("Backend", QUESTIONS[1:2], 1)
+    bank.select("Frontend", QUESTIONS[2:3], 1)
+    bank.select("Data", QUESTIONS[3:4], 1)
+
+    assert list(bank.banks) == ["frontend", "data"]
+
+
+def test_select_without_reuse_raises_instead_of_repeating():
+    bank = QuestionBank()
+    bank.select("Backend Engineer", QUESTIONS[:3], 3, session_id="s1")
+
+    with pytest.raises(NotEnoughQuestions):
+        bank.select("Backend Engineer", QUESTIONS[:3], 3, session_id="s1", reuse_seen=False)
+
+
+def test_select_pads_a_short_set_and_keeps_the_real_questions():
+    bank = QuestionBank()
+    padding = _questions("Where do you see yourself in 5 years?", *[q["text"] for q in QUESTIONS[3:]])
+
+    selected = bank.select("Backend Engineer", QUESTIONS[:2], 5, session_id="s1", padding=padding)
+
+    assert len(selected) == 5
+    assert selected[:2] == QUESTIONS[:2]
+    assert len({q["text"] for q in selected}) == 5
+
+
+def test_padding_skips_questions_already_selected():
+    bank = QuestionBank()
+
+    selected = bank.select("Backend Engineer", QUESTIONS[:2], 3, padding=QUESTIONS[:3])
+
+    assert selected == QUESTIONS[:3]
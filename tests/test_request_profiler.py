@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import request_profiler
+from request_profiler import ProfilingMiddleware, RequestProfiler, to_speedscope
+
+
+def _busy(n: int = 20000) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def _awaiting_app(scope, receive, send):
+    _busy()
+    await asyncio.sleep(0.01)
+    _busy()
+    await asyncio.sleep(0)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _profile(app) -> dict:
+    profiler = RequestProfiler()
+    middleware = ProfilingMiddleware(app, profiler)
+    scope = {"type": "http", "method": "GET", "path": "/api/test", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+    return profiler.traces[0]
+
+
+def test_speedscope_weights_match_pstats_total_for_awaiting_handler(monkeypatch):
+    monkeypatch.setattr(request_profiler, "PROFILE_SAMPLE_RATE", 1.0)
+    trace = _profile(_awaiting_app)
+
+    profile = to_speedscope(trace)["profiles"][0]
+    pstats_total = sum(tottime for _, _, tottime, _, _ in trace["stats"].values())
+
+    assert trace["status"] == 200
+    assert sum(profile["weights"]) == pytest.approx(pstats_total, rel=1e-6)
+    assert profile["endValue"] == pytest.approx(pstats_total, rel=1e-6)
+
+    frames = to_speedscope(trace)["shared"]["frames"]
+    assert "_busy" in {frames[i]["name"] for stack in profile["samples"] for i in stack}
+
+
+def test_timing_is_labelled_thread_wide(monkeypatch):
+    monkeypatch.setattr(request_profiler, "PROFILE_SAMPLE_RATE", 1.0)
+    trace = _profile(_awaiting_app)
+
+    assert "cpu_ms" not in trace and "await_ms" not in trace
+    assert trace["thread_cpu_ms"] + trace["thread_idle_ms"] == pytest.approx(trace["wall_ms"], abs=0.02)
+    assert trace["thread_idle_ms"] >= 5